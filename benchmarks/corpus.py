@@ -0,0 +1,78 @@
+# Synthetic DER corpus for the benchmarks, each shape is a run of
+# top-level records repeated until the requested size is reached
+import random
+
+
+SHAPES = ['wide', 'deep', 'large_primitive', 'multi_byte_tag']
+
+
+def encode_length(length: int) -> bytes:
+   if length < 0x80:
+      return bytes([length])
+   length_bytes = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+   return bytes([0x80 | len(length_bytes)]) + length_bytes
+
+
+def encode_tlv(tag: bytes, value: bytes) -> bytes:
+   return tag + encode_length(len(value)) + value
+
+
+def _wide_record(rand: random.Random) -> tuple[bytes, int]:
+   # SEQUENCE of many small INTEGER and OCTET STRING
+   children = []
+   for i in range(32):
+      if i % 2:
+         children.append(encode_tlv(b'\x02', rand.randbytes(rand.randint(1, 8))))
+      else:
+         children.append(encode_tlv(b'\x04', rand.randbytes(rand.randint(1, 24))))
+   return encode_tlv(b'\x30', b''.join(children)), len(children) + 1
+
+
+def _deep_record(rand: random.Random, depth: int = 64) -> tuple[bytes, int]:
+   # chain of constructed context specific TLVs, each with a leaf next to the nested one
+   encoded = encode_tlv(b'\x80', rand.randbytes(4))
+   count = 1
+   for level in range(depth):
+      leaf = encode_tlv(b'\x81', rand.randbytes(2))
+      encoded = encode_tlv(bytes([0xA0 | (level % 31)]), leaf + encoded)
+      count += 2
+   return encoded, count
+
+
+def _large_primitive_record(rand: random.Random) -> tuple[bytes, int]:
+   # OCTET STRING of a few KB to 64KB
+   return encode_tlv(b'\x04', rand.randbytes(rand.randint(4 * 1024, 64 * 1024))), 1
+
+
+# EMV like 2 and 3 byte tags
+_MULTI_BYTE_TAGS = [b'\x9f\x02', b'\x9f\x03', b'\x5f\x2a', b'\x9f\x1a', b'\x9f\x36', b'\xdf\x81\x01', b'\xbf\x0c']
+
+def _multi_byte_tag_record(rand: random.Random) -> tuple[bytes, int]:
+   children = []
+   for _ in range(24):
+      tag = rand.choice(_MULTI_BYTE_TAGS[:-1])
+      children.append(encode_tlv(tag, rand.randbytes(rand.randint(1, 12))))
+   return encode_tlv(b'\x70', encode_tlv(_MULTI_BYTE_TAGS[-1], b''.join(children))), len(children) + 2
+
+
+_RECORDS = {
+   'wide': _wide_record,
+   'deep': _deep_record,
+   'large_primitive': _large_primitive_record,
+   'multi_byte_tag': _multi_byte_tag_record,
+}
+
+
+def generate(shape: str, size: int, seed: int = 0) -> tuple[bytes, int]:
+   """ returns at least size bytes of DER of the shape, and the number of TLVs in it """
+   rand = random.Random(seed)
+   record_fn = _RECORDS[shape]
+   records = []
+   total = 0
+   count = 0
+   while total < size:
+      record, record_count = record_fn(rand)
+      records.append(record)
+      total += len(record)
+      count += record_count
+   return b''.join(records), count
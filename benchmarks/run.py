@@ -0,0 +1,149 @@
+# Measures throughput and peak memory of the byte getters, the parser
+# and the output builder separately, on the synthetic corpus.
+#
+#    python -m benchmarks.run --size 2000000 --out results.json
+#    python -m benchmarks.run --compare results.json
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from benchmarks.corpus import SHAPES, generate
+from tlvisuals.tlv_parser import ByteGetter, DerByteGetter, TLVParser
+from tlvisuals.parallel_parser import ParallelTLVParser
+from tlvisuals.flat_tree import flatten_tlvs, unflatten_tlvs
+from tlvisuals.output_builder.raw_format import RawFormatBuilder
+from tlvisuals.tlv_encoder import TLVEncoder
+
+
+def _consume(iterator):
+   for _ in iterator:
+      pass
+
+
+def _benchmarks(corpus: bytes) -> dict[str, Callable[[], Callable[[], object]]]:
+   """
+      each benchmark is a setup function returning the function to measure,
+      so that preparing the input isn't measured
+   """
+   hex_text = corpus.hex()
+   parsed = TLVParser().parse_buffer(corpus)
+   flat = flatten_tlvs(parsed)
+   return {
+      'ByteGetter': lambda: (lambda stream: lambda: _consume(ByteGetter(stream)))(io.StringIO(hex_text)),
+      'DerByteGetter': lambda: (lambda stream: lambda: _consume(DerByteGetter(stream)))(io.BytesIO(corpus)),
+      'TLVParser.parse_tlv': lambda: lambda: TLVParser().parse_tlv(iter(corpus)),
+      'TLVParser.parse_buffer': lambda: lambda: TLVParser().parse_buffer(corpus),
+      # one process per core, parts small enough that the corpus is split
+      'ParallelTLVParser.parse_buffer': lambda: lambda: ParallelTLVParser(min_part_size=64 * 1024).parse_buffer(corpus),
+      # share of the parallel parse left in the main process, rebuilding the
+      # trees sent by the workers, it bounds the speedup over parse_buffer
+      'ParallelTLVParser.rebuild': lambda: lambda: unflatten_tlvs(memoryview(corpus), 0, flat),
+      'RawFormatBuilder.build': lambda: lambda: RawFormatBuilder(inline_interpretation=True).build(parsed),
+      'TLVEncoder.encode': lambda: lambda: TLVEncoder().encode(parsed),
+   }
+
+
+def _measure(setup: Callable[[], Callable[[], object]], repeat: int) -> tuple[float, int]:
+   """ best time of repeat runs, and peak memory of one more run traced by tracemalloc """
+   best = None
+   for _ in range(repeat):
+      fn = setup()
+      start = time.perf_counter()
+      fn()
+      elapsed = time.perf_counter() - start
+      best = elapsed if best is None else min(best, elapsed)
+
+   # traced separately, tracing slows down the run too much to time it
+   fn = setup()
+   tracemalloc.start()
+   try:
+      fn()
+      _, peak = tracemalloc.get_traced_memory()
+   finally:
+      tracemalloc.stop()
+   return best, peak
+
+
+def run(size: int, repeat: int, shapes: list[str], benchmarks: list[str]|None) -> dict:
+   results = []
+   for shape in shapes:
+      corpus, tlv_count = generate(shape, size)
+      for name, setup in _benchmarks(corpus).items():
+         if benchmarks and name not in benchmarks:
+            continue
+         seconds, peak = _measure(setup, repeat)
+         result = {
+            'shape': shape,
+            'benchmark': name,
+            'bytes': len(corpus),
+            'tlvs': tlv_count,
+            'seconds': seconds,
+            'mb_per_s': len(corpus) / seconds / 1_000_000,
+            'tlvs_per_s': tlv_count / seconds,
+            'peak_memory_bytes': peak,
+         }
+         results.append(result)
+         print('{:<16} {:<32} {:>9.2f} MB/s {:>12.0f} TLVs/s {:>10.1f} MB peak'.format(
+            shape, name, result['mb_per_s'], result['tlvs_per_s'], peak / 1_000_000), flush=True)
+   return {
+      'meta': {
+         'python': platform.python_version(),
+         'platform': platform.platform(),
+         'size': size,
+         'repeat': repeat,
+         'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+      },
+      'results': results,
+   }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+   """ results whose throughput dropped by more than threshold (a fraction) from the baseline """
+   baseline_results = {(result['shape'], result['benchmark']): result for result in baseline['results']}
+   regressions = []
+   for result in current['results']:
+      old = baseline_results.get((result['shape'], result['benchmark']))
+      if old is None:
+         continue
+      change = result['mb_per_s'] / old['mb_per_s'] - 1
+      if change < -threshold:
+         regressions.append('{} {}: {:.2f} -> {:.2f} MB/s ({:+.0%})'.format(
+            result['shape'], result['benchmark'], old['mb_per_s'], result['mb_per_s'], change))
+   return regressions
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Benchmarks tlvisuals on a synthetic DER corpus")
+   parser.add_argument('--size', type=int, default=1_000_000, help="Bytes of DER per shape")
+   parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark, the best time is kept")
+   parser.add_argument('--shape', action='append', choices=SHAPES, help="Only runs the given shapes")
+   parser.add_argument('--benchmark', action='append', help="Only runs the given benchmarks")
+   parser.add_argument('--out', help="Writes the results as JSON to OUT")
+   parser.add_argument('--compare', help="Baseline JSON results, exits with 1 if throughput regressed")
+   parser.add_argument('--threshold', type=float, default=0.1, help="Throughput drop counted as regression, default 0.1")
+   args = parser.parse_args()
+
+   current = run(args.size, args.repeat, args.shape or SHAPES, args.benchmark)
+   if args.out:
+      with open(args.out, 'wt') as f:
+         json.dump(current, f, indent=1)
+
+   if args.compare:
+      with open(args.compare) as f:
+         regressions = compare(json.load(f), current, args.threshold)
+      for regression in regressions:
+         print('regression: ' + regression)
+      return 1 if regressions else 0
+   return 0
+
+
+if __name__ == '__main__':
+   sys.exit(main())
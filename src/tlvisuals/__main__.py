@@ -1,9 +1,21 @@
 import argparse
 from argparse import RawTextHelpFormatter
+import os
 import sys
-import json
-from tlvisuals.tlv_parser import ByteGetter, TLVParser, DiagnosticsCollector, DerByteGetter
+import time
+from tlvisuals.tlv import TLV, TagType
+from tlvisuals.tlv_parser import ByteGetter, TLVParser, DiagnosticsCollector, DerByteGetter, map_file
 from tlvisuals.output_builder.raw_format import RawFormatBuilder
+from tlvisuals.output_builder.json_format import JsonLinesBuilder
+from tlvisuals.output_builder.binary_format import ColumnarBuilder
+from tlvisuals.batch import collect_input_files, format_diagnostic, run_batch
+from tlvisuals.parallel_parser import ParallelTLVParser
+from tlvisuals.tlv_index import open_index, parse_entry
+from tlvisuals.tlv_find import find_tags
+from tlvisuals.tlv_diff import DiffType, diff_buffers
+from tlvisuals.instrumentation import ParseStats
+from tlvisuals.parse_cache import ParseCache
+from tlvisuals.tag_dictionary import create_dictionary
 
 
 def main():
@@ -19,11 +31,45 @@ def main():
    tlvparse_parser.add_argument('-f', '--file', help="Parses input from specified FILE")
    tlvparse_parser.add_argument('-o', '--out', help="Writes output to specified OUT file")
    tlvparse_parser.add_argument('--input-format', help="Specifies input format:\n -der: input is raw hex\notherwise assumed to be ascii hex")  # inform formats: 'der', 'hextext'
-   tlvparse_parser.add_argument('--output-format', help="Specifies output format:\n -interpretation: shows basic TLV flag interpretation")
+   tlvparse_parser.add_argument('--output-format', help="Specifies output format:\n -interpretation: shows basic TLV flag interpretation\n -json: JSON Lines, one record per TLV with its path, depth, offset and hex value\n -binary: compact columnar binary dump")
+   tlvparse_parser.add_argument('--mmap', action='store_true', help="Memory-maps the input FILE instead of reading it byte by byte,\nonly with --input-format der")
+   tlvparse_parser.add_argument('-j', '--jobs', type=int, help="Splits the top-level TLVs of the input over JOBS worker processes")
+   tlvparse_parser.add_argument('--stats', choices=['text', 'json'], help="Writes counters and timings of the parse to standard error, as text or json")
+   tlvparse_parser.add_argument('--cache', action='store_true', help="Loads the parsed tree from the cache of previous runs on the same input,\nor stores it there, the input is then read whole before parsing")
+   tlvparse_parser.add_argument('--cache-dir', help="Directory of the cache, defaults to $XDG_CACHE_HOME/tlvisuals or ~/.cache/tlvisuals")
+   tlvparse_parser.add_argument('--dictionary', choices=['x690', 'emv', 'all'], help="Adds the names of known tags and decoded primitive values to the output,\nas \"name\" and \"decoded\" fields with --output-format json, not supported with binary:\n -x690: universal types\n -emv: EMV tags\n -all: both")
 
    hextoraw_parser = subparsers.add_parser(name="hextoraw",description="Converts ASCII hex input to raw bytes, ignoring whitespaces")
    hextoraw_parser.add_argument('-f', '--file', help="Reads input from specified FILE")
    hextoraw_parser.add_argument('-o', '--out', help="Writes output to specified OUT file")
+
+   tlvbatch_parser = subparsers.add_parser(name="tlvbatch", description="Parses many files on a pool of processes, like tlvparse on each file. Exits with 1 if any file has diagnostics")
+   tlvbatch_parser.add_argument('inputs', nargs='+', help="Directories or glob patterns of the files to parse")
+   tlvbatch_parser.add_argument('-o', '--out', help="Writes the outputs of all files to specified OUT file, each preceded by a '==> path <==' line")
+   tlvbatch_parser.add_argument('--out-dir', help="Writes the output of each file to OUT_DIR/<path>.txt instead, path being relative to the directory common to all inputs")
+   tlvbatch_parser.add_argument('-j', '--jobs', type=int, help="Number of worker processes, defaults to the number of CPUs")
+   tlvbatch_parser.add_argument('--input-format', help="Specifies input format:\n -der: input is raw hex\notherwise assumed to be ascii hex")
+   tlvbatch_parser.add_argument('--output-format', help="Specifies output format:\n -interpretation: shows basic TLV flag interpretation")
+
+   tlvindex_parser = subparsers.add_parser(name="tlvindex", description="Indexes the offsets of the TLVs of a DER FILE into a sidecar file, and parses only the subtrees matching a tag path", formatter_class=RawTextHelpFormatter)
+   tlvindex_parser.add_argument('-f', '--file', required=True, help="DER FILE to index")
+   tlvindex_parser.add_argument('--index', help="Index file, defaults to FILE.tlvidx")
+   tlvindex_parser.add_argument('--rebuild', action='store_true', help="Rebuilds the index even if it is up to date")
+   tlvindex_parser.add_argument('-q', '--query', help="Tag path of the TLVs to parse, e.g. 30/A1[3]/04\n[n] selects the n-th (from 0) occurrence among siblings,\notherwise every occurrence matches")
+   tlvindex_parser.add_argument('-o', '--out', help="Writes output to specified OUT file")
+   tlvindex_parser.add_argument('--output-format', help="Specifies output format:\n -interpretation: shows basic TLV flag interpretation")
+
+   tlvfind_parser = subparsers.add_parser(name="tlvfind", description="Finds TLVs by tag or tag path, reading only the headers and skipping values by their lengths", formatter_class=RawTextHelpFormatter)
+   tlvfind_parser.add_argument('patterns', nargs='+', help="Tags or tag paths to find, e.g. 5A, 9F02, 70/5A or /30/A1[3]/04\na pattern matches the TLVs whose path ends with it,\nor starts at the top level if it starts with '/'.\n[n] selects the n-th (from 0) occurrence among siblings")
+   tlvfind_parser.add_argument('-f', '--file', help="Searches input from specified FILE")
+   tlvfind_parser.add_argument('-o', '--out', help="Writes output to specified OUT file")
+   tlvfind_parser.add_argument('--input-format', help="Specifies input format:\n -der: input is raw hex\notherwise assumed to be ascii hex")
+
+   tlvdiff_parser = subparsers.add_parser(name="tlvdiff", description="Compares two TLV files by tag path, skipping the TLVs whose bytes are equal", formatter_class=RawTextHelpFormatter)
+   tlvdiff_parser.add_argument('old', help="First FILE")
+   tlvdiff_parser.add_argument('new', help="Second FILE")
+   tlvdiff_parser.add_argument('-o', '--out', help="Writes output to specified OUT file")
+   tlvdiff_parser.add_argument('--input-format', help="Specifies input format of both files:\n -der: input is raw hex\notherwise assumed to be ascii hex")
    args = parser.parse_args()
 
    
@@ -32,6 +78,14 @@ def main():
          sys.exit(tlvparse(args=args))
       case "hextoraw":
          sys.exit(hextoraw(args=args))
+      case "tlvbatch":
+         sys.exit(tlvbatch(args=args))
+      case "tlvindex":
+         sys.exit(tlvindex(args=args))
+      case "tlvfind":
+         sys.exit(tlvfind(args=args))
+      case "tlvdiff":
+         sys.exit(tlvdiff(args=args))
       case _:
          print("Unknown command")
          parser.print_help()
@@ -40,8 +94,98 @@ def main():
 
 def tlvparse(args):
    # print(args.file, args.out, args.verbose)
+   if args.mmap and not (args.file and args.input_format == 'der'):
+      print("--mmap requires --file and --input-format der", file=sys.stderr)
+      return 1
+   if args.dictionary and args.output_format == 'binary':
+      print("--dictionary is not supported with --output-format binary", file=sys.stderr)
+      return 1
 
-   # construct byte getter
+   diags = DiagnosticsCollector()
+   stats = ParseStats() if args.stats else None
+   parser = TLVParser(diagnostic_collector=diags, stats=stats)
+
+   # output is written while the tree is walked, or while parsing
+   # for the iterator path, instead of building the whole string
+   output_builder = _create_output_builder(args, stats)
+   if args.output_format == 'binary':
+      output = open(args.out, 'wb') if args.out else sys.stdout.buffer
+   else:
+      output = open(args.out, 'wt') if args.out else sys.stdout
+   try:
+      if args.cache:
+         output_builder.build_on_output(_parse_cached(args, parser, diags, stats), output)
+      elif args.jobs:
+         parallel_parser = ParallelTLVParser(diagnostic_collector=diags, jobs=args.jobs)
+         if args.file and args.input_format == 'der':
+            input_len = os.path.getsize(args.file)
+            start = time.perf_counter()
+            parsed_tlvs = parallel_parser.parse_file(args.file)
+         else:
+            buffer = bytes(_create_byte_getter(args))
+            input_len = len(buffer)
+            start = time.perf_counter()
+            parsed_tlvs = parallel_parser.parse_buffer(buffer)
+         if stats:
+            # workers aren't instrumented, the whole parse is timed and the resulting tree counted
+            stats.add_parse(parsed_tlvs, input_len, time.perf_counter() - start)
+            stats.diagnostics = len(diags.get_diagnostics())
+         output_builder.build_on_output(parsed_tlvs, output)
+      elif args.mmap:
+         # parser walks the mapped pages directly
+         output_builder.build_on_output(parser.parse_buffer(map_file(args.file)), output)
+      else:
+         output_builder.build_events_on_output(parser.iter_events(_create_byte_getter(args)), output)
+   finally:
+      if args.out:
+         output.close()
+
+   if stats:
+      sys.stderr.write(stats.format_json() + '\n' if args.stats == 'json' else stats.format_text())
+   return 0
+
+
+def _parse_cached(args, parser: TLVParser, diags: DiagnosticsCollector, stats: ParseStats|None) -> list[TLV]:
+   """ tree of the whole input from the parse cache, parsed and stored if missing """
+   if args.file and args.input_format == 'der':
+      buffer = map_file(args.file)
+   else:
+      buffer = bytes(_create_byte_getter(args))
+   cache = ParseCache(args.cache_dir)
+   key = cache.get_key(buffer)
+   start = time.perf_counter()
+   parsed_tlvs = cache.load(key, buffer)
+   if parsed_tlvs is not None:
+      if stats:
+         stats.add_parse(parsed_tlvs, len(buffer), time.perf_counter() - start)
+      return parsed_tlvs
+
+   if args.jobs:
+      start = time.perf_counter()
+      parsed_tlvs = ParallelTLVParser(diagnostic_collector=diags, jobs=args.jobs).parse_buffer(buffer)
+      if stats:
+         stats.add_parse(parsed_tlvs, len(buffer), time.perf_counter() - start)
+         stats.diagnostics = len(diags.get_diagnostics())
+   else:
+      parsed_tlvs = parser.parse_buffer(buffer)
+   # trees with diagnostics aren't stored, they are reported on each run
+   if not diags.get_diagnostics():
+      cache.store(key, parsed_tlvs)
+   return parsed_tlvs
+
+
+def _create_output_builder(args, stats):
+   match(args.output_format):
+      case 'json':
+         return JsonLinesBuilder(tag_dictionary=create_dictionary(args.dictionary) if args.dictionary else None)
+      case 'binary':
+         return ColumnarBuilder()
+      case _:
+         return RawFormatBuilder(inline_interpretation = True if args.output_format == "interpretation" else False, stats=stats,
+                                 tag_dictionary=create_dictionary(args.dictionary) if args.dictionary else None)
+
+
+def _create_byte_getter(args):
    if args.file:
       if args.input_format and args.input_format == 'der':
          input_stream = open(args.file, 'rb')
@@ -54,27 +198,7 @@ def tlvparse(args):
       byte_getter = DerByteGetter(input_stream)
    else:
       byte_getter = ByteGetter(input_stream)
-  
-
-   # construct parser
-   diags = DiagnosticsCollector()
-   parser = TLVParser(diagnostic_collector=diags)
-   parsed_tlvs = parser.parse_tlv(byte_getter)
-   # for tlv in parsed_tlvs:
-   #    print(json.dumps(tlv, indent=1))
-
-   # build output
-   output_builder = RawFormatBuilder(inline_interpretation = True if args.output_format == "interpretation" else False)
-   out_str = output_builder.build(parsed_tlvs)
-
-   # write to stream
-   if args.out:
-      with open(args.out, 'wt') as f:
-         f.write(out_str)
-   else:
-      sys.stdout.write(out_str)
-   
-   return 0
+   return byte_getter
 
 
 def hextoraw(args):
@@ -95,5 +219,122 @@ def hextoraw(args):
    return 0
 
 
+def tlvbatch(args):
+   paths = collect_input_files(args.inputs)
+   if not paths:
+      print("No input files found", file=sys.stderr)
+      return 1
+
+   inline_interpretation = True if args.output_format == "interpretation" else False
+   if args.out_dir:
+      files_with_diagnostics = run_batch(paths, None, sys.stderr, args.out_dir, args.input_format, inline_interpretation, args.jobs)
+   elif args.out:
+      with open(args.out, 'wt') as f:
+         files_with_diagnostics = run_batch(paths, f, sys.stderr, None, args.input_format, inline_interpretation, args.jobs)
+   else:
+      files_with_diagnostics = run_batch(paths, sys.stdout, sys.stderr, None, args.input_format, inline_interpretation, args.jobs)
+
+   # scripted runs can tell that some files failed
+   return 1 if files_with_diagnostics else 0
+
+
+def tlvindex(args):
+   buffer = map_file(args.file)
+   index = open_index(args.file, buffer, args.index, args.rebuild)
+   if not args.query:
+      print(f'{len(index)} TLVs indexed')
+      return 0
+
+   try:
+      entries = index.find(args.query)
+   except ValueError as e:
+      print(e, file=sys.stderr)
+      return 1
+
+   diags = DiagnosticsCollector()
+   output_builder = RawFormatBuilder(inline_interpretation = True if args.output_format == "interpretation" else False)
+   output = open(args.out, 'wt') if args.out else sys.stdout
+   try:
+      for entry in entries:
+         output.write(f'{index.get_path(entry)} @{index.offsets[entry]}\n')
+         output_builder.build_on_output(parse_entry(buffer, index, entry, diags), output)
+   finally:
+      if args.out:
+         output.close()
+   return 0 if entries else 1
+
+
+def tlvfind(args):
+   if args.input_format == 'der':
+      if args.file:
+         buffer = map_file(args.file)
+      else:
+         buffer = sys.stdin.buffer.read()
+   else:
+      buffer = bytes(_create_byte_getter(args))
+
+   diags = DiagnosticsCollector()
+   try:
+      matches = find_tags(buffer, args.patterns, diags)
+      found = False
+      output = open(args.out, 'wt') if args.out else sys.stdout
+      try:
+         for match in matches:
+            found = True
+            line = '@{} {} {} {}'.format(match.offset, match.path, match.tag.hex().upper(), match.length.hex().upper())
+            if match.value is not None:
+               line += ' ' + match.value.hex().upper()
+            output.write(line + '\n')
+      finally:
+         if args.out:
+            output.close()
+   except ValueError as e:
+      print(e, file=sys.stderr)
+      return 1
+
+   for diagnostic in diags.get_diagnostics():
+      print(format_diagnostic(diagnostic), file=sys.stderr)
+   return 0 if found else 1
+
+
+def _format_diff_tlv(marker: str, offset: int, path: str, tlv: TLV) -> str:
+   line = '{} @{} {} {} {}'.format(marker, offset, path, tlv.tag.raw.hex().upper(), tlv.length.raw.hex().upper())
+   if tlv.tag.type == TagType.PRIMITIVE and tlv.value is not None:
+      line += ' ' + tlv.value.get_raw().hex().upper()
+   return line + '\n'
+
+
+def tlvdiff(args):
+   buffers = []
+   for path in (args.old, args.new):
+      if args.input_format == 'der':
+         buffers.append(map_file(path))
+      else:
+         with open(path, 'r') as f:
+            buffers.append(bytes(ByteGetter(f)))
+
+   diags = DiagnosticsCollector()
+   different = False
+   output = open(args.out, 'wt') if args.out else sys.stdout
+   try:
+      # removed '-', added '+', changed as the old '<' then the new '>'
+      for diff in diff_buffers(buffers[0], buffers[1], diags):
+         different = True
+         if diff.type == DiffType.REMOVED:
+            output.write(_format_diff_tlv('-', diff.old_offset, diff.path, diff.old))
+         elif diff.type == DiffType.ADDED:
+            output.write(_format_diff_tlv('+', diff.new_offset, diff.path, diff.new))
+         else:
+            output.write(_format_diff_tlv('<', diff.old_offset, diff.path, diff.old))
+            output.write(_format_diff_tlv('>', diff.new_offset, diff.path, diff.new))
+   finally:
+      if args.out:
+         output.close()
+
+   for diagnostic in diags.get_diagnostics():
+      print(format_diagnostic(diagnostic), file=sys.stderr)
+   return 1 if different else 0
+
+
 if __name__ == '__main__':
    main()
\ No newline at end of file
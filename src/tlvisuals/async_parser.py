@@ -0,0 +1,41 @@
+import asyncio
+from typing import AsyncIterator
+from tlvisuals.tlv import TLV
+from tlvisuals.tlv_parser import ByteGetter, DiagnosticsCollector
+from tlvisuals.push_parser import PushTLVParser
+
+
+class AsyncTLVParser:
+   """
+      Parses DER from an asyncio StreamReader as chunks arrive, and yields
+      each top-level TLV as soon as all of its bytes are received, through
+      a PushTLVParser fed with the chunks.
+
+         async for tlv in AsyncTLVParser(reader):
+            ...
+   """
+   def __init__(
+         self,
+         reader: asyncio.StreamReader,
+         diagnostic_collector: DiagnosticsCollector|None = None,
+         chunk_size: int = ByteGetter.CHUNK_SIZE
+         ) -> None:
+      self._reader = reader
+      self._chunk_size = chunk_size
+      self._push_parser = PushTLVParser(diagnostic_collector)
+      self.diagnostic_collector = self._push_parser.diagnostic_collector
+
+   def __aiter__(self) -> AsyncIterator[TLV]:
+      return self._iter_tlvs()
+
+   async def _iter_tlvs(self) -> AsyncIterator[TLV]:
+      while True:
+         chunk = await self._reader.read(self._chunk_size)
+         if not chunk:
+            break
+         for tlv in self._push_parser.feed(chunk):
+            yield tlv
+
+      # EOF, the incomplete TLV is parsed for its diagnostics
+      for tlv in self._push_parser.close():
+         yield tlv
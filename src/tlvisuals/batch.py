@@ -0,0 +1,107 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TextIO
+from tlvisuals.tlv_parser import ByteGetter, TLVParser, DiagnosticsCollector, map_file
+from tlvisuals.output_builder.raw_format import RawFormatBuilder
+
+
+def collect_input_files(inputs: list[str]) -> list[str]:
+   """
+      Expands each input to the files to parse, a directory gives
+      the files directly in it, anything else is used as a glob pattern
+   """
+   result = []
+   for input in inputs:
+      if os.path.isdir(input):
+         names = sorted(os.listdir(input))
+         result.extend(os.path.join(input, name) for name in names if os.path.isfile(os.path.join(input, name)))
+      else:
+         result.extend(path for path in sorted(glob.glob(input, recursive=True)) if os.path.isfile(path))
+   return result
+
+
+def format_diagnostic(diagnostic: dict|str) -> str:
+   if isinstance(diagnostic, dict):
+      return '{}: {}'.format(diagnostic['error_type'], diagnostic['msg'])
+   return str(diagnostic)
+
+
+def get_output_paths(paths: list[str], out_dir: str) -> list[str]:
+   """
+      Output file of each input in out_dir, named after its path relative to
+      the directory common to all inputs, so inputs with the same name in
+      different directories don't overwrite each other
+   """
+   directories = [os.path.dirname(os.path.abspath(path)) for path in paths]
+   root = os.path.commonpath(directories) if directories else ''
+   return [os.path.join(out_dir, os.path.relpath(os.path.abspath(path), root) + '.txt') for path in paths]
+
+
+def parse_file(path: str, input_format: str|None, inline_interpretation: bool, out_path: str|None) -> tuple[str, str|None, list]:
+   """
+      Parses and formats one file, runs in the worker processes.
+      If out_path is given the output is written there and None is returned
+      in its place, so it doesn't have to be sent back to the main process
+   """
+   diags = DiagnosticsCollector()
+   parser = TLVParser(diagnostic_collector=diags)
+   try:
+      if input_format == 'der':
+         parsed_tlvs = parser.parse_buffer(map_file(path))
+      else:
+         with open(path, 'r') as f:
+            parsed_tlvs = parser.parse_buffer(bytes(ByteGetter(f)))
+   except (OSError, ValueError) as e:
+      diags.add_error(str(e))
+      return path, None, diags.get_diagnostics()
+
+   output_builder = RawFormatBuilder(inline_interpretation=inline_interpretation)
+   if out_path is None:
+      return path, output_builder.build(parsed_tlvs), diags.get_diagnostics()
+
+   os.makedirs(os.path.dirname(out_path), exist_ok=True)
+   with open(out_path, 'wt') as f:
+      output_builder.build_on_output(parsed_tlvs, f)
+   return path, None, diags.get_diagnostics()
+
+
+def run_batch(
+      paths: list[str],
+      output: TextIO|None,
+      diagnostics_output: TextIO,
+      out_dir: str|None = None,
+      input_format: str|None = None,
+      inline_interpretation: bool = False,
+      jobs: int|None = None
+      ) -> int:
+   """
+      Parses the files on a process pool. Outputs are either written one file
+      per input into out_dir, named by get_output_paths, or to output one after
+      the other in input order, each preceded by a '==> path <==' line. Diagnostics of each file are
+      written to diagnostics_output, returns the number of files with diagnostics
+   """
+   if out_dir is not None:
+      os.makedirs(out_dir, exist_ok=True)
+      out_paths = get_output_paths(paths, out_dir)
+   else:
+      out_paths = [None] * len(paths)
+
+   files_with_diagnostics = 0
+   with ProcessPoolExecutor(max_workers=jobs) as executor:
+      results = executor.map(
+         parse_file,
+         paths,
+         [input_format] * len(paths),
+         [inline_interpretation] * len(paths),
+         out_paths,
+         chunksize=max(1, len(paths) // (4 * (jobs or os.cpu_count() or 1))))
+      for path, out_str, diagnostics in results:
+         if out_str is not None and output is not None:
+            output.write(f'==> {path} <==\n')
+            output.write(out_str)
+         if diagnostics:
+            files_with_diagnostics += 1
+            for diagnostic in diagnostics:
+               diagnostics_output.write(f'{path}: {format_diagnostic(diagnostic)}\n')
+   return files_with_diagnostics
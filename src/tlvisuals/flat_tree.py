@@ -0,0 +1,81 @@
+import gc
+from tlvisuals.tlv import TLV, Length, PrimitiveValue, ConstructedValue
+from tlvisuals.tlv_parser import SMALL_VALUE_SIZE, intern_tag
+
+
+# values of the children field in the flattened tree
+PRIMITIVE = -1
+NO_VALUE = -2
+FIELDS = 5
+
+
+def flatten_tlvs(tlvs: list[TLV]) -> list[int]:
+   """
+      Preorder list of the fields needed to rebuild the tree over the same bytes,
+      cheaper to send between processes or to store than the TLV objects. Raw bytes aren't
+      included, the parse is sequential so they follow each other in preorder,
+      tags are decoded again from their raw bytes
+   """
+   flat = []
+   stack = list(reversed(tlvs))
+   while stack:
+      tlv = stack.pop()
+      if tlv.value is None:
+         children = NO_VALUE
+      elif isinstance(tlv.value, ConstructedValue):
+         children = len(tlv.value.children)
+         stack.extend(reversed(tlv.value.children))
+      else:
+         children = PRIMITIVE
+      flat.extend((len(tlv.tag.raw), len(tlv.length.raw), tlv.length.length, tlv.length.indefinite, children))
+   return flat
+
+
+def unflatten_tlvs(buffer: memoryview, pos: int, flat: list[int]) -> list[TLV]:
+   """
+      rebuilds the TLVs flattened by flatten_tlvs, with raw bytes sliced from buffer at pos.
+      The tree has no reference cycles, so the cyclic collector is paused, collections
+      triggered while its objects are allocated would only walk them again and again
+   """
+   gc_enabled = gc.isenabled()
+   gc.disable()
+   try:
+      return _rebuild_tlvs(buffer, pos, flat)
+   finally:
+      if gc_enabled:
+         gc.enable()
+
+
+def _rebuild_tlvs(buffer: memoryview, pos: int, flat: list[int]) -> list[TLV]:
+   result = []
+   # children lists being filled, with the number of TLVs they still expect
+   # and whether they end with an end-of-contents
+   stack = []
+   siblings, remaining, indefinite_parent = result, -1, False
+   for i in range(0, len(flat), FIELDS):
+      tag_len, length_len, length, indefinite, children = flat[i:i+FIELDS]
+      tag = intern_tag(buffer[pos:pos+tag_len])
+      pos += tag_len
+      tlv = TLV(tag, Length(length, bytes(buffer[pos:pos+length_len]), bool(indefinite)), None)
+      pos += length_len
+      siblings.append(tlv)
+      remaining -= 1
+
+      if children == PRIMITIVE:
+         # copied like in TLVParser.parse_buffer when short
+         value = buffer[pos:pos+length]
+         tlv.value = PrimitiveValue(bytes(value) if length <= SMALL_VALUE_SIZE else value)
+         pos += length
+      elif children != NO_VALUE:
+         tlv.value = ConstructedValue()
+         if children > 0:
+            stack.append((siblings, remaining, indefinite_parent))
+            siblings, remaining, indefinite_parent = tlv.value.children, children, indefinite
+            continue
+         if indefinite:
+            pos += 2
+      while remaining == 0:
+         if indefinite_parent:
+            pos += 2
+         siblings, remaining, indefinite_parent = stack.pop()
+   return result
@@ -0,0 +1,146 @@
+import json
+import time
+from typing import Callable, Iterator
+from tlvisuals.tlv import TLV, ConstructedValue
+from tlvisuals.tlv_parser import ParseEvent, ParseEventType
+
+
+class ParseStats:
+   """
+      Counters and timings of parsing and building the output, collected
+      once passed to TLVParser or RawFormatBuilder. The measured methods are
+      wrapped on that instance only, so without stats the plain methods run
+      and nothing is counted
+   """
+   # phases timed, with the methods measured
+   PARSER_PHASES = [
+      ('tag', '_parse_tag'),
+      ('tag', '_parse_tag_buffer'),
+      ('length', '_parse_length'),
+      ('length', '_parse_length_buffer'),
+      ('value', '_parse_value'),
+      ('value', '_parse_value_buffer'),
+   ]
+
+   def __init__(self) -> None:
+      self.bytes_consumed = 0
+      self.tlvs_per_depth: dict[int, int] = {}
+      self.diagnostics = 0
+      # seconds spent and number of calls of each phase
+      self.timings: dict[str, float] = {}
+      self.calls: dict[str, int] = {}
+
+   def timed(self, phase: str, fn: Callable) -> Callable:
+      """ wraps fn to add the time of each call to phase """
+      timings, calls = self.timings, self.calls
+      timings.setdefault(phase, 0.0)
+      calls.setdefault(phase, 0)
+      perf_counter = time.perf_counter
+
+      def wrapper(*args, **kwargs):
+         start = perf_counter()
+         try:
+            return fn(*args, **kwargs)
+         finally:
+            timings[phase] += perf_counter() - start
+            calls[phase] += 1
+      return wrapper
+
+   def instrument_parser(self, parser) -> None:
+      for phase, name in self.PARSER_PHASES:
+         setattr(parser, name, self.timed(phase, getattr(parser, name)))
+
+      iter_events = parser.iter_events
+      parser.iter_events = lambda input: self._count_events(iter_events(input), parser.diagnostic_collector)
+
+      parse_buffer = self.timed('parse', parser.parse_buffer)
+      def instrumented_parse_buffer(buffer, lazy=False):
+         diagnostics = len(parser.diagnostic_collector.get_diagnostics())
+         result = parse_buffer(buffer, lazy)
+         self.diagnostics += len(parser.diagnostic_collector.get_diagnostics()) - diagnostics
+         self.count_tree(result)
+         return result
+      parser.parse_buffer = instrumented_parse_buffer
+
+      parse_buffer_tlvs = parser._parse_buffer_tlvs
+      def instrumented_parse_buffer_tlvs(buffer, pos, end, parent_length, lazy):
+         result, new_pos = parse_buffer_tlvs(buffer, pos, end, parent_length, lazy)
+         if end is None:
+            # top level, deferred children are within bytes already counted
+            self.bytes_consumed += min(new_pos, len(buffer)) - pos
+         return result, new_pos
+      parser._parse_buffer_tlvs = instrumented_parse_buffer_tlvs
+
+   def instrument_builder(self, builder) -> None:
+      builder._format_line = self.timed('build', builder._format_line)
+
+   def _count_events(self, events: Iterator[ParseEvent], diagnostic_collector) -> Iterator[ParseEvent]:
+      """ counts the events passing through, the time between them is the parse time """
+      diagnostics = len(diagnostic_collector.get_diagnostics())
+      self.timings.setdefault('parse', 0.0)
+      self.calls['parse'] = self.calls.get('parse', 0) + 1
+      perf_counter = time.perf_counter
+      start = perf_counter()
+      for event in events:
+         self.timings['parse'] += perf_counter() - start
+         if event.depth == 0 and event.end_offset is not None:
+            self.bytes_consumed += event.end_offset - event.offset
+         if event.type != ParseEventType.END_CONSTRUCTED:
+            self._add_tlv(event.depth)
+         yield event
+         start = perf_counter()
+      self.timings['parse'] += perf_counter() - start
+      self.diagnostics += len(diagnostic_collector.get_diagnostics()) - diagnostics
+
+   def _add_tlv(self, depth: int):
+      self.tlvs_per_depth[depth] = self.tlvs_per_depth.get(depth, 0) + 1
+
+   def count_tree(self, tlvs: list[TLV]):
+      """ counts the TLVs per depth of a parsed tree, children not loaded yet are skipped """
+      stack = [(tlv, 0) for tlv in tlvs]
+      while stack:
+         tlv, depth = stack.pop()
+         self._add_tlv(depth)
+         if isinstance(tlv.value, ConstructedValue) and tlv.value.is_loaded():
+            stack.extend((child, depth + 1) for child in tlv.value.children)
+
+   def add_parse(self, tlvs: list[TLV], bytes_consumed: int, seconds: float):
+      """
+         counts a tree not parsed by the instrumented parser, e.g. in worker
+         processes or loaded from a cache, its parse timed as a single call
+      """
+      self.timings['parse'] = self.timings.get('parse', 0.0) + seconds
+      self.calls['parse'] = self.calls.get('parse', 0) + 1
+      self.bytes_consumed += bytes_consumed
+      self.count_tree(tlvs)
+
+   def get_timings(self) -> dict[str, float]:
+      """ seconds of the phases that were measured, wrapped methods never called are left out """
+      return {phase: seconds for phase, seconds in self.timings.items() if self.calls[phase]}
+
+   def get_tlv_count(self) -> int:
+      return sum(self.tlvs_per_depth.values())
+
+   def to_dict(self) -> dict:
+      return {
+         'bytes_consumed': self.bytes_consumed,
+         'tlvs': self.get_tlv_count(),
+         'tlvs_per_depth': {str(depth): count for depth, count in sorted(self.tlvs_per_depth.items())},
+         'diagnostics': self.diagnostics,
+         'timings': {phase: {'seconds': seconds, 'calls': self.calls.get(phase, 0)} for phase, seconds in self.get_timings().items()},
+      }
+
+   def format_json(self) -> str:
+      return json.dumps(self.to_dict(), indent=1)
+
+   def format_text(self) -> str:
+      lines = [
+         f'bytes consumed: {self.bytes_consumed}',
+         f'TLVs: {self.get_tlv_count()}',
+      ]
+      for depth, count in sorted(self.tlvs_per_depth.items()):
+         lines.append(f'   depth {depth}: {count}')
+      lines.append(f'diagnostics: {self.diagnostics}')
+      for phase, seconds in self.get_timings().items():
+         lines.append(f'{phase}: {seconds:.6f} s, {self.calls[phase]} calls')
+      return '\n'.join(lines) + '\n'
@@ -0,0 +1,149 @@
+import struct
+import sys
+from array import array
+from io import BytesIO
+from typing import BinaryIO, Iterable, Iterator
+from tlvisuals.tlv import *
+from tlvisuals.tlv_parser import ParseEvent, ParseEventType, tree_events
+
+"""
+   Writes TLVs in a compact columnar binary format, in preorder.
+   After the magic and header, rows are written in groups, each with
+   its own tag table, one array per column and the primitive values
+   concatenated in a blob:
+
+      magic 'TLVCOL', version, little endian flag
+      group: rows, tag count (<II), tags (<H length + raw bytes),
+             columns depth, offset, tag_id, length, value_offset, value_len,
+             blob length (<q) + blob
+
+   length is -1 for indefinite lengths, clamped to MAX_LENGTH for long form
+   lengths not fitting the column, value_offset -1 when there is no
+   primitive value. Columns are in the byte order of the writer
+"""
+MAGIC = b'TLVCOL'
+VERSION = 1
+_HEADER = struct.Struct('<BB')
+_GROUP_HEADER = struct.Struct('<II')
+MAX_LENGTH = 2**63 - 1
+
+# name and array type of each column, in the order they are written
+COLUMNS = [
+   ('depth', 'I'),
+   ('offset', 'q'),
+   ('tag_id', 'I'),
+   ('length', 'q'),
+   ('value_offset', 'q'),
+   ('value_len', 'q'),
+]
+
+
+class ColumnarFormatException(Exception):
+   pass
+
+
+class ColumnarBuilder:
+   # rows collected before writing them as a group
+   GROUP_ROWS = 64 * 1024
+
+   def __init__(self, group_rows: int = GROUP_ROWS) -> None:
+      self._group_rows = group_rows
+
+   def _write_group(self, output: BinaryIO, tags: list[bytes], columns: list[array], blob: bytearray):
+      output.write(_GROUP_HEADER.pack(len(columns[0]), len(tags)))
+      for tag in tags:
+         output.write(struct.pack('<H', len(tag)))
+         output.write(tag)
+      for column in columns:
+         output.write(column.tobytes())
+      output.write(struct.pack('<q', len(blob)))
+      output.write(blob)
+
+   def build_events_on_output(self, events: Iterable[ParseEvent], output: BinaryIO):
+      """ writes a row per TLV as their events arrive, e.g. from TLVParser.iter_events """
+      output.write(MAGIC)
+      output.write(_HEADER.pack(VERSION, sys.byteorder == 'little'))
+
+      tag_ids: dict[bytes, int] = {}
+      tags = []
+      columns = [array(type) for _, type in COLUMNS]
+      depths, offsets, tag_id_column, lengths, value_offsets, value_lens = columns
+      blob = bytearray()
+      for event in events:
+         if event.type == ParseEventType.END_CONSTRUCTED:
+            continue
+         tlv = event.tlv
+         raw_tag = bytes(tlv.tag.raw)
+         tag_id = tag_ids.get(raw_tag)
+         if tag_id is None:
+            tag_id = tag_ids[raw_tag] = len(tags)
+            tags.append(raw_tag)
+
+         depths.append(event.depth)
+         offsets.append(event.offset)
+         tag_id_column.append(tag_id)
+         lengths.append(-1 if tlv.length.indefinite else min(tlv.length.length, MAX_LENGTH))
+         if event.type == ParseEventType.PRIMITIVE and tlv.value is not None:
+            value = tlv.value.get_raw()
+            value_offsets.append(len(blob))
+            value_lens.append(len(value))
+            blob += value
+         else:
+            value_offsets.append(-1)
+            value_lens.append(0)
+
+         if len(depths) >= self._group_rows:
+            self._write_group(output, tags, columns, blob)
+            tag_ids.clear()
+            tags.clear()
+            for column in columns:
+               del column[:]
+            blob.clear()
+
+      if len(depths):
+         self._write_group(output, tags, columns, blob)
+
+   def build_on_output(self, input: list[TLV], output: BinaryIO):
+      self.build_events_on_output(tree_events(input), output)
+
+   def build(self, input: list[TLV]) -> bytes:
+      output = BytesIO()
+      self.build_on_output(input, output)
+      return output.getvalue()
+
+
+def read_groups(input: BinaryIO) -> Iterator[tuple[list[bytes], dict[str, array], bytes]]:
+   """ reads the groups written by ColumnarBuilder, as the tag table, the columns by name and the blob """
+   if input.read(len(MAGIC)) != MAGIC:
+      raise ColumnarFormatException('Not a columnar TLV file')
+   header = input.read(_HEADER.size)
+   if len(header) != _HEADER.size:
+      raise ColumnarFormatException('Truncated columnar TLV file')
+   version, little_endian = _HEADER.unpack(header)
+   if version != VERSION:
+      raise ColumnarFormatException(f'Unsupported columnar TLV version {version}')
+
+   while True:
+      group_header = input.read(_GROUP_HEADER.size)
+      if not group_header:
+         return
+      try:
+         rows, tag_count = _GROUP_HEADER.unpack(group_header)
+         tags = []
+         for _ in range(tag_count):
+            tag_len, = struct.unpack('<H', input.read(2))
+            tags.append(input.read(tag_len))
+         columns = {}
+         for name, type in COLUMNS:
+            column = array(type)
+            column.frombytes(input.read(rows * column.itemsize))
+            if len(column) != rows:
+               raise ColumnarFormatException('Truncated columnar TLV file')
+            if little_endian != (sys.byteorder == 'little'):
+               column.byteswap()
+            columns[name] = column
+         blob_len, = struct.unpack('<q', input.read(8))
+         blob = input.read(blob_len)
+      except struct.error:
+         raise ColumnarFormatException('Truncated columnar TLV file')
+      yield tags, columns, blob
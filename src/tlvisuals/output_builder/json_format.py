@@ -0,0 +1,95 @@
+import json
+from io import StringIO
+from typing import TYPE_CHECKING, Iterable, TextIO
+from tlvisuals.tlv import *
+from tlvisuals.tlv_parser import ParseEvent, ParseEventType, tree_events
+if TYPE_CHECKING:
+   from tlvisuals.tag_dictionary import TagDictionary
+
+"""
+   Prints one JSON object per line for each TLV, in preorder:
+   {"path": "30[0]/A1[3]", "depth": 1, "offset": 12, "tag": "A1", "class": "CONTEXT_SPECIFIC",
+    "type": "CONSTRUCTED", "tag_number": 1, "length": 5, "value": null}
+   path has the same syntax as the tlvindex queries, length is null for
+   indefinite lengths and value is the hex of primitive values.
+   With a tag dictionary, records also have the "name" of the tag and the
+   "decoded" primitive value, null when unknown
+"""
+class JsonLinesBuilder:
+   # characters of lines collected before writing them to the output
+   FLUSH_SIZE = 64 * 1024
+   # distinct tags whose strings are kept
+   CACHE_SIZE = 4096
+
+   def __init__(self, flush_size: int = FLUSH_SIZE, tag_dictionary: 'TagDictionary|None' = None) -> None:
+      self._flush_size = flush_size
+      self._tag_dictionary = tag_dictionary
+      # hex and the fixed part of the record by Tag, parsed tags are interned
+      self._tag_strs: dict[Tag, tuple[str, str]] = {}
+
+   def _format_tag(self, tag: Tag) -> tuple[str, str]:
+      tag_str = self._tag_strs.get(tag)
+      if tag_str is None:
+         tag_hex = tag.raw.hex().upper()
+         fields = '"tag":"{}","class":"{}","type":"{}","tag_number":{}'.format(tag_hex, tag.cla, tag.type, tag.tag_number)
+         if self._tag_dictionary is not None:
+            fields += ',"name":' + json.dumps(self._tag_dictionary.get_name(tag))
+         if len(self._tag_strs) >= self.CACHE_SIZE:
+            self._tag_strs.clear()
+         tag_str = self._tag_strs[tag] = (tag_hex, fields)
+      return tag_str
+
+   def build_events_on_output(self, events: Iterable[ParseEvent], output: TextIO):
+      """
+         Writes a record per TLV as their events arrive, e.g. from TLVParser.iter_events,
+         flush_size characters at a time. Only the open constructed TLVs are tracked
+      """
+      lines = []
+      size = 0
+      # occurrences of each tag among the children of the open levels, and the path prefix of their children
+      occurrences = [{}]
+      paths = ['']
+      for event in events:
+         if event.type == ParseEventType.END_CONSTRUCTED:
+            occurrences.pop()
+            paths.pop()
+            continue
+
+         tlv = event.tlv
+         tag_hex, tag_fields = self._format_tag(tlv.tag)
+         level = occurrences[-1]
+         occurrence = level.get(tag_hex, 0)
+         level[tag_hex] = occurrence + 1
+         path = '{}{}[{}]'.format(paths[-1], tag_hex, occurrence)
+
+         length = 'null' if tlv.length.indefinite else tlv.length.length
+         if event.type == ParseEventType.PRIMITIVE and tlv.value is not None:
+            value = '"' + tlv.value.get_raw().hex().upper() + '"'
+         else:
+            value = 'null'
+         if self._tag_dictionary is not None:
+            decoded = None
+            if event.type == ParseEventType.PRIMITIVE and tlv.value is not None:
+               decoded = self._tag_dictionary.decode(tlv.tag, tlv.value.get_raw())
+            value += ',"decoded":' + json.dumps(decoded)
+         line = '{{"path":"{}","depth":{},"offset":{},{},"length":{},"value":{}}}\n'.format(
+            path, event.depth, event.offset, tag_fields, length, value)
+         lines.append(line)
+         size += len(line)
+         if size >= self._flush_size:
+            output.write(''.join(lines))
+            lines.clear()
+            size = 0
+
+         if event.type == ParseEventType.START_CONSTRUCTED:
+            occurrences.append({})
+            paths.append(path + '/')
+      output.write(''.join(lines))
+
+   def build_on_output(self, input: list[TLV], output: TextIO):
+      self.build_events_on_output(tree_events(input), output)
+
+   def build(self, input: list[TLV]) -> str:
+      output = StringIO()
+      self.build_on_output(input, output)
+      return output.getvalue()
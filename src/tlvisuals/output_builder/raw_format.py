@@ -2,65 +2,144 @@
 
 
 from io import StringIO
+from typing import TYPE_CHECKING, Iterable, TextIO
 from tlvisuals.tlv import *
+from tlvisuals.tlv_parser import ParseEvent, ParseEventType
+if TYPE_CHECKING:
+   from tlvisuals.instrumentation import ParseStats
+   from tlvisuals.tag_dictionary import TagDictionary
+
+# length part of the lines of single byte definite lengths
+_SHORT_LENGTHS = ['{:02X}'.format(length) for length in range(128)]
+_SHORT_LENGTHS_INTERPRETED = ['{:02X} (length:{})'.format(length, length) for length in range(128)]
 
 """
    Prints TLVs with indentation and with interpretation 
    of basic TLV flags if enabled
 """
 class RawFormatBuilder:
-   def __init__(self, indent_size:int = 3,  indent:int = 0, inline_interpretation: bool = True) -> None:
+   # characters of lines collected before writing them to the output
+   FLUSH_SIZE = 64 * 1024
+   # distinct tags whose strings are kept
+   CACHE_SIZE = 4096
+
+   def __init__(
+         self,
+         indent_size:int = 3,
+         indent:int = 0,
+         inline_interpretation: bool = True,
+         stats: 'ParseStats|None' = None,
+         flush_size: int = FLUSH_SIZE,
+         tag_dictionary: 'TagDictionary|None' = None
+         ) -> None:
       self._indent_size = indent_size
       self._indent_str = ' ' * indent_size
       self._indent = indent
       self._inline_interpretation = inline_interpretation
-
-   def _add_indent(self, output: StringIO):
-      for _ in range(0, self._indent):
-         output.write(self._indent_str)
-
-
-   def _build_primitive(self, tlv: TLV, output:StringIO):
-      output.write(' ')
-      output.write(tlv.value.get_raw().hex().upper())
-
-
-   def _build_constructed(self, tlv: TLV, output:StringIO):
-      new_builder = RawFormatBuilder(self._indent_size, self._indent+1)
-      new_builder._inline_interpretation = self._inline_interpretation
-      new_builder.build_on_output(tlv.value.children, output)
-
-
-   def _build_tlv(self, tlv: TLV, output:StringIO):
-      self._add_indent(output)
-      output.write(tlv.tag.raw.hex().upper())
-      if self._inline_interpretation:
-         output.write(' (class:{};type:{};tagnum:{})'.format(tlv.tag.cla, tlv.tag.type, tlv.tag.tag_number))
-      output.write(' ')
-      output.write(tlv.length.raw.hex().upper())
-      if self._inline_interpretation:
-         output.write(' (length:{})'.format(tlv.length.length))
-      if not tlv.value is None:
-         if tlv.tag.type == TagType.PRIMITIVE:
-            self._build_primitive(tlv, output)
-            output.write('\n')
+      self._flush_size = flush_size
+      # names of the tags and decoded primitive values, if set
+      self._tag_dictionary = tag_dictionary
+      # indent prefix of each depth
+      self._indents: list[str] = []
+      # tag strings by Tag, parsed tags are interned so repeated tags hit
+      # the same entry, without and with interpretation
+      self._tag_strs: tuple[dict[Tag, tuple[str, bool]], dict[Tag, tuple[str, bool]]] = ({}, {})
+      self.stats = stats
+      if stats is not None:
+         stats.instrument_builder(self)
+
+   def _get_indent(self, depth: int) -> str:
+      indents = self._indents
+      while len(indents) <= depth:
+         indents.append(self._indent_str * (self._indent + len(indents)))
+      return indents[depth]
+
+   def _format_tag(self, tag: Tag) -> tuple[str, bool]:
+      """ tag part of the line, and whether the tag is primitive """
+      tag_strs = self._tag_strs[self._inline_interpretation]
+      tag_str = tag_strs.get(tag)
+      if tag_str is None:
+         name = None if self._tag_dictionary is None else self._tag_dictionary.get_name(tag)
+         if self._inline_interpretation:
+            text = '{} (class:{};type:{};tagnum:{}{}) '.format(tag.raw.hex().upper(), tag.cla, tag.type, tag.tag_number,
+                                                             '' if name is None else ';name:' + name)
+         elif name is not None:
+            text = '{} (name:{}) '.format(tag.raw.hex().upper(), name)
          else:
-            output.write('\n')
-            self._build_constructed(tlv, output)
-      else:
-         output.write('\n')
-
-
-   def build_on_output(self, input: list[TLV], output: StringIO):
-      for tlv in input:
-         self._build_tlv(tlv, output)
+            text = tag.raw.hex().upper() + ' '
+         if len(tag_strs) >= self.CACHE_SIZE:
+            tag_strs.clear()
+         tag_str = tag_strs[tag] = (text, tag.type == TagType.PRIMITIVE)
+      return tag_str
+
+   def _format_length(self, length: Length) -> str:
+      raw = length.raw
+      if len(raw) == 1 and not length.indefinite and length.length == raw[0]:
+         return (_SHORT_LENGTHS_INTERPRETED if self._inline_interpretation else _SHORT_LENGTHS)[raw[0]]
+      if self._inline_interpretation:
+         return '{} (length:{})'.format(raw.hex().upper(), 'indefinite' if length.indefinite else length.length)
+      return raw.hex().upper()
+
+   def _format_line(self, tlv: TLV, depth: int = 0) -> str:
+      """ line of the TLV, without its children """
+      tag_str, primitive = self._format_tag(tlv.tag)
+      line = self._get_indent(depth) + tag_str + self._format_length(tlv.length)
+      if primitive and not tlv.value is None:
+         raw = tlv.value.get_raw()
+         if self._tag_dictionary is not None:
+            decoded = self._tag_dictionary.decode(tlv.tag, raw)
+            if decoded is not None:
+               return line + ' ' + raw.hex().upper() + ' (value:' + decoded + ')\n'
+         return line + ' ' + raw.hex().upper() + '\n'
+      return line + '\n'
+
+
+   def build_on_output(self, input: list[TLV], output: TextIO):
+      """
+         Writes the lines while walking the tree, flush_size characters at a time,
+         output can be a file or stdout so the whole string is never built
+      """
+      lines = []
+      size = 0
+      # iterators over the children of the open constructed TLVs,
+      # nesting is kept on this stack instead of recursing per level
+      stack = [iter(input)]
+      while stack:
+         tlv = next(stack[-1], None)
+         if tlv is None:
+            stack.pop()
+            continue
+         line = self._format_line(tlv, len(stack) - 1)
+         lines.append(line)
+         size += len(line)
+         if size >= self._flush_size:
+            output.write(''.join(lines))
+            lines.clear()
+            size = 0
+         if not tlv.value is None and tlv.tag.type != TagType.PRIMITIVE:
+            stack.append(iter(tlv.value.children))
+      output.write(''.join(lines))
+
+   def build_events_on_output(self, events: Iterable[ParseEvent], output: TextIO):
+      """
+         Writes the TLVs as their events arrive, e.g. from TLVParser.iter_events,
+         flush_size characters at a time. Gives the same output as build_on_output
+         on the parsed tree
+      """
+      lines = []
+      size = 0
+      for event in events:
+         if event.type != ParseEventType.END_CONSTRUCTED:
+            line = self._format_line(event.tlv, event.depth)
+            lines.append(line)
+            size += len(line)
+            if size >= self._flush_size:
+               output.write(''.join(lines))
+               lines.clear()
+               size = 0
+      output.write(''.join(lines))
 
    def build(self, input: list[TLV]) -> str:
       output = StringIO()
       self.build_on_output(input, output)
       return output.getvalue()
-   
-
-
-
-   
\ No newline at end of file
@@ -0,0 +1,126 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from tlvisuals.tlv import TLV
+from tlvisuals.tlv_parser import TLVParser, DiagnosticsCollector, map_file, to_buffer
+from tlvisuals.flat_tree import flatten_tlvs, unflatten_tlvs
+
+
+def scan_top_level(buffer: memoryview) -> list[int]:
+   """
+      Offsets of the top-level TLVs, found by reading only their tags and
+      lengths and skipping the values. Stops at the first header that can't be read
+   """
+   scanner = TLVParser()
+   offsets = []
+   pos = 0
+   while pos < len(buffer):
+      offsets.append(pos)
+      tag, pos = scanner._parse_tag_buffer(buffer, pos, None, 0)
+      if tag is None:
+         break
+      length, pos = scanner._parse_length_buffer(buffer, pos, None, 0)
+      if length is None:
+         break
+      if length.indefinite:
+         end_of_contents = scanner._find_end_of_contents(buffer, pos)
+         if end_of_contents is None:
+            break
+         pos = end_of_contents + 2
+      else:
+         pos += length.length
+   return offsets
+
+
+def split_ranges(offsets: list[int], total: int, parts: int) -> list[tuple[int, int]]:
+   """ groups consecutive top-level TLVs into about parts byte ranges of similar size """
+   target = total / parts
+   ranges = []
+   start = 0
+   for offset in offsets[1:]:
+      if offset - start >= target:
+         ranges.append((start, offset))
+         start = offset
+   ranges.append((start, total))
+   return ranges
+
+
+def _parse_part(source: str|bytes, start: int, stop: int) -> tuple[list[int], list, bool]:
+   """
+      Parses the top-level TLVs of one range, runs in the worker processes.
+      source is either the path of the file, or the bytes of the range.
+      Returns the flattened TLVs, the diagnostics, and whether the last TLV
+      ended exactly at the end of the range
+   """
+   if isinstance(source, str):
+      buffer = map_file(source)[start:stop]
+   else:
+      buffer = to_buffer(source)
+
+   parser = TLVParser()
+   result, pos = parser._parse_buffer_tlvs(buffer, 0, None, 0, False)
+   return flatten_tlvs(result), parser.diagnostic_collector.get_diagnostics(), pos == len(buffer)
+
+
+class ParallelTLVParser:
+   """
+      Parses long runs of top-level TLVs on a pool of processes.
+      Top-level headers are scanned first to split the input into ranges,
+      the subtrees of each range are parsed in the workers and merged back
+      in order, giving the same list as TLVParser.parse_buffer, with raw
+      bytes also sliced from the input
+   """
+   MIN_PART_SIZE = 1024 * 1024
+
+   def __init__(
+         self,
+         diagnostic_collector: DiagnosticsCollector|None = None,
+         jobs: int|None = None,
+         min_part_size: int = MIN_PART_SIZE
+         ) -> None:
+      if diagnostic_collector is None:
+         self.diagnostic_collector = DiagnosticsCollector()
+      else:
+         self.diagnostic_collector = diagnostic_collector
+      self._jobs = jobs
+      self._min_part_size = min_part_size
+
+   def parse_file(self, path: str) -> list[TLV]:
+      # workers map the file themselves instead of being sent their range
+      return self._parse(map_file(path), path)
+
+   def parse_buffer(self, buffer: bytes|bytearray|memoryview) -> list[TLV]:
+      return self._parse(to_buffer(buffer), None)
+
+   def _parse_sequential(self, buffer: memoryview) -> list[TLV]:
+      return TLVParser(diagnostic_collector=self.diagnostic_collector).parse_buffer(buffer)
+
+   def _parse(self, buffer: memoryview, path: str|None) -> list[TLV]:
+      jobs = self._jobs or os.cpu_count() or 1
+      parts = min(jobs * 4, len(buffer) // self._min_part_size)
+      if jobs <= 1 or parts <= 1:
+         return self._parse_sequential(buffer)
+      ranges = split_ranges(scan_top_level(buffer), len(buffer), parts)
+      if len(ranges) == 1:
+         return self._parse_sequential(buffer)
+
+      result = []
+      with ProcessPoolExecutor(max_workers=jobs) as executor:
+         futures = [
+            executor.submit(_parse_part, path if path else bytes(buffer[start:stop]), start, stop)
+            for start, stop in ranges
+         ]
+         for i, future in enumerate(futures):
+            flat, diagnostics, clean = future.result()
+            # the last range always ends where the sequential parse would
+            if clean or i == len(ranges) - 1:
+               result.extend(unflatten_tlvs(buffer, ranges[i][0], flat))
+               self.diagnostic_collector.extend_diagnostics(diagnostics)
+               continue
+
+            # the range didn't end at the next top-level TLV, e.g. a child exceeding
+            # its parent length or EOF, so parse the rest sequentially like parse_buffer
+            for pending in futures[i+1:]:
+               pending.cancel()
+            result.extend(self._parse_sequential(buffer[ranges[i][0]:]))
+            break
+      return result
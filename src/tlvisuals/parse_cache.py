@@ -0,0 +1,100 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from tlvisuals.tlv import TLV
+from tlvisuals.tlv_parser import to_buffer
+from tlvisuals.flat_tree import FIELDS, flatten_tlvs, unflatten_tlvs
+
+
+def default_cache_dir() -> str:
+   """ tlvisuals directory in XDG_CACHE_HOME, ~/.cache by default """
+   return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'tlvisuals')
+
+
+class ParseCache:
+   """
+   Parsed trees stored on disk by the sha256 of their input, to skip the
+   parser when the same input is parsed again. Entries hold the tree
+   flattened like for ParallelTLVParser, rebuilt over the input bytes when
+   loaded, so only trees of inputs parsed without diagnostics are stored,
+   whose TLVs follow each other in the input.
+   Least recently used entries are removed once the directory exceeds max_size
+   """
+   SUFFIX = '.tlvcache'
+   _MAGIC = b'TLVPC'
+   # part of the keys, to be bumped when the parsed trees or the entry format
+   # change so entries of older versions are never loaded
+   VERSION = 1
+   # version, byte order, number of flattened fields
+   _HEADER = struct.Struct('<BBq')
+   MAX_SIZE = 256 * 1024 * 1024
+
+   def __init__(self, directory: str|None = None, max_size: int = MAX_SIZE) -> None:
+      self.directory = default_cache_dir() if directory is None else directory
+      self.max_size = max_size
+
+   def get_key(self, buffer: bytes|bytearray|memoryview) -> str:
+      digest = hashlib.sha256(struct.pack('<B', self.VERSION))
+      digest.update(buffer)
+      return digest.hexdigest()
+
+   def _get_path(self, key: str) -> str:
+      return os.path.join(self.directory, key + self.SUFFIX)
+
+   def load(self, key: str, buffer: bytes|bytearray|memoryview) -> list[TLV]|None:
+      """ tree of the buffer from its entry, None if not cached """
+      path = self._get_path(key)
+      try:
+         with open(path, 'rb') as f:
+            header = f.read(len(self._MAGIC) + self._HEADER.size)
+            if len(header) != len(self._MAGIC) + self._HEADER.size or header[:len(self._MAGIC)] != self._MAGIC:
+               return None
+            version, little_endian, fields = self._HEADER.unpack(header[len(self._MAGIC):])
+            if version != self.VERSION or fields % FIELDS != 0:
+               return None
+            flat = array('q')
+            flat.fromfile(f, fields)
+         # recently used entries are evicted last
+         os.utime(path)
+      except (OSError, EOFError):
+         # also when evicted by another process in the meantime, a plain miss
+         return None
+      if little_endian != (sys.byteorder == 'little'):
+         flat.byteswap()
+      return unflatten_tlvs(to_buffer(buffer), 0, flat.tolist())
+
+   def store(self, key: str, tlvs: list[TLV]):
+      """ writes the entry of a tree parsed without diagnostics, then evicts the oldest entries """
+      os.makedirs(self.directory, exist_ok=True)
+      flat = array('q', flatten_tlvs(tlvs))
+      path = self._get_path(key)
+      # written aside then renamed, so concurrent runs never load a partial entry
+      temp_path = '{}.{}.tmp'.format(path, os.getpid())
+      with open(temp_path, 'wb') as f:
+         f.write(self._MAGIC)
+         f.write(self._HEADER.pack(self.VERSION, sys.byteorder == 'little', len(flat)))
+         flat.tofile(f)
+      os.replace(temp_path, path)
+      self.evict()
+
+   def evict(self):
+      """ removes the least recently used entries until the directory fits in max_size """
+      entries = []
+      total = 0
+      with os.scandir(self.directory) as it:
+         for entry in it:
+            if entry.name.endswith(self.SUFFIX) and entry.is_file():
+               stat = entry.stat()
+               entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+               total += stat.st_size
+      entries.sort()
+      for _, size, path in entries:
+         if total <= self.max_size:
+            break
+         try:
+            os.remove(path)
+         except FileNotFoundError:
+            pass
+         total -= size
@@ -0,0 +1,105 @@
+from tlvisuals.tlv import TLV
+from tlvisuals.tlv_parser import TLVParser, DiagnosticsCollector, read_header
+
+
+class PushTLVParser:
+   """
+      Parses DER pushed in chunks of any size. feed returns the top-level TLVs
+      completed by the chunk, close the TLVs left at the end of the input.
+      Only the bytes of the incomplete top-level TLV are kept between chunks,
+      and how far it was scanned, so earlier bytes are never read again.
+      Top-level lengths are trusted to find where each TLV ends, its bytes
+      are then parsed like parse_buffer
+   """
+   def __init__(self, diagnostic_collector: DiagnosticsCollector|None = None) -> None:
+      if diagnostic_collector is None:
+         self.diagnostic_collector = DiagnosticsCollector()
+      else:
+         self.diagnostic_collector = diagnostic_collector
+      self._parser = TLVParser(diagnostic_collector=self.diagnostic_collector)
+      self._pending = bytearray()
+      # offset of the incomplete TLV in _pending, and of its end once known
+      self._start = 0
+      self._end: int|None = None
+      # scan of an indefinite length TLV for its end-of-contents, offset of
+      # the next header to read and number of nested indefinite lengths open
+      self._scan_pos: int|None = None
+      self._scan_depth = 0
+      # set once a TLV couldn't be parsed, the following bytes can't be located
+      self._failed = False
+      self._closed = False
+
+   def feed(self, chunk: bytes|bytearray|memoryview) -> list[TLV]:
+      if self._closed:
+         raise ValueError('feed() called after close()')
+      if self._failed:
+         return []
+      self._pending += chunk
+      result = []
+      while True:
+         if self._end is None:
+            self._end = self._find_end()
+         if self._end is None or self._end > len(self._pending):
+            break
+         tlvs = self._parse_pending(self._end)
+         if not tlvs:
+            self._failed = True
+            self._pending.clear()
+            self._start, self._end = 0, None
+            break
+         result.extend(tlvs)
+
+      # only the incomplete TLV is kept
+      if self._start:
+         del self._pending[:self._start]
+         if self._end is not None:
+            self._end -= self._start
+         if self._scan_pos is not None:
+            self._scan_pos -= self._start
+         self._start = 0
+      return result
+
+   def close(self) -> list[TLV]:
+      """ parses the bytes left, reporting the TLV cut off by the end of the input """
+      self._closed = True
+      if self._failed or self._start == len(self._pending):
+         return []
+      return self._parse_pending(len(self._pending))
+
+   def _parse_pending(self, end: int) -> list[TLV]:
+      # copied since _pending is resized afterwards
+      tlvs = self._parser.parse_buffer(bytes(self._pending[self._start:end]))
+      self._start, self._end = end, None
+      self._scan_pos = None
+      return tlvs
+
+   def _find_end(self) -> int|None:
+      """ end offset of the TLV at _start, None until enough bytes are fed to know it """
+      if self._scan_pos is None:
+         header = read_header(self._pending, self._start)
+         if header is None:
+            return None
+         constructed, length, header_end = header
+         if length is not None:
+            return header_end + length
+         if not constructed:
+            # invalid, only the header is taken so the parse reports it
+            return header_end
+         self._scan_pos, self._scan_depth = header_end, 0
+
+      # resumes the scan for the end-of-contents, definite length values are skipped
+      pending = self._pending
+      while True:
+         header = read_header(pending, self._scan_pos)
+         if header is None:
+            return None
+         constructed, length, header_end = header
+         if length is None:
+            self._scan_depth += 1
+         elif length == 0 and pending[self._scan_pos] == 0 and header_end - self._scan_pos == 2:
+            if self._scan_depth == 0:
+               return header_end
+            self._scan_depth -= 1
+         else:
+            header_end += length
+         self._scan_pos = header_end
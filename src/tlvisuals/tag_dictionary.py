@@ -0,0 +1,336 @@
+import re
+from typing import Callable
+from tlvisuals.tlv import Tag, PrimitiveType
+
+"""
+   Names of known tags and decoders of their values, for X.690 universal
+   types and EMV. Decoders take the raw value and return a readable string,
+   or raise ValueError if the value doesn't have the expected format
+"""
+
+Decoder = Callable[[bytes], str]
+
+
+def _printable(text: str) -> str:
+   return ''.join(c if c.isprintable() else '.' for c in text)
+
+def decode_boolean(value: bytes) -> str:
+   if len(value) != 1:
+      raise ValueError('BOOLEAN must be one byte')
+   return 'FALSE' if value[0] == 0 else 'TRUE'
+
+def decode_integer(value: bytes) -> str:
+   if not value:
+      raise ValueError('INTEGER must not be empty')
+   return str(int.from_bytes(value, 'big', signed=True))
+
+def decode_null(value: bytes) -> str:
+   if value:
+      raise ValueError('NULL must be empty')
+   return 'NULL'
+
+def _decode_arcs(value: bytes) -> list[int]:
+   arcs = []
+   arc = 0
+   for i, byte in enumerate(value):
+      if arc == 0 and byte == 0x80:
+         raise ValueError('OID arc must not start with 0x80')
+      arc = (arc << 7) | (byte & 0b0111_1111)
+      if byte & 0b1000_0000 == 0:
+         arcs.append(arc)
+         arc = 0
+      elif i == len(value) - 1:
+         raise ValueError('OID ends inside an arc')
+   return arcs
+
+# decoded arcs by their encoding, shared by all OIDs since they mostly
+# differ in their last arcs. First arcs hold the first two numbers
+OID_ARC_CACHE_SIZE = 4096
+_oid_arcs: dict[bytes, str] = {}
+_oid_first_arcs: dict[bytes, str] = {}
+
+def _decode_oid_arc(encoded: bytes, first: bool) -> str:
+   cache = _oid_first_arcs if first else _oid_arcs
+   arc = cache.get(encoded)
+   if arc is None:
+      number, = _decode_arcs(encoded)
+      if first:
+         # the first two arcs are encoded together
+         top = min(number // 40, 2)
+         arc = '{}.{}'.format(top, number - top * 40)
+      else:
+         arc = str(number)
+      if len(cache) >= OID_ARC_CACHE_SIZE:
+         cache.clear()
+      cache[encoded] = arc
+   return arc
+
+def decode_oid(value: bytes) -> str:
+   value = bytes(value)
+   arcs = []
+   start = 0
+   for i, byte in enumerate(value):
+      if byte < 0b1000_0000:
+         arcs.append(_decode_oid_arc(value[start:i+1], start == 0))
+         start = i + 1
+   if start != len(value):
+      raise ValueError('OID ends inside an arc')
+   if not arcs:
+      raise ValueError('OID must not be empty')
+   return '.'.join(arcs)
+
+def decode_relative_oid(value: bytes) -> str:
+   arcs = _decode_arcs(value)
+   if not arcs:
+      raise ValueError('RELATIVE-OID must not be empty')
+   return '.'.join(str(arc) for arc in arcs)
+
+def _string_decoder(encoding: str) -> Decoder:
+   def decode(value: bytes) -> str:
+      try:
+         return _printable(value.decode(encoding))
+      except UnicodeDecodeError as e:
+         raise ValueError(str(e))
+   return decode
+
+decode_ascii = _string_decoder('ascii')
+decode_utf8 = _string_decoder('utf-8')
+
+_UTC_TIME_REGX = re.compile(r'(\d\d)(\d\d)(\d\d)(\d\d)(\d\d)(\d\d)?(Z|[+-]\d{4})')
+_GENERALIZED_TIME_REGX = re.compile(r'(\d{4})(\d\d)(\d\d)(\d\d)(\d\d)?(\d\d)?([.,]\d+)?(Z|[+-]\d{4})?')
+
+def decode_utc_time(value: bytes) -> str:
+   match = _UTC_TIME_REGX.fullmatch(decode_ascii(value))
+   if match is None:
+      raise ValueError('Invalid UTCTime')
+   year, month, day, hour, minute, second, zone = match.groups()
+   # two digit years from 50 are 19xx
+   century = '19' if int(year) >= 50 else '20'
+   return '{}{}-{}-{} {}:{}:{} {}'.format(century, year, month, day, hour, minute, second or '00', 'UTC' if zone == 'Z' else zone)
+
+def decode_generalized_time(value: bytes) -> str:
+   match = _GENERALIZED_TIME_REGX.fullmatch(decode_ascii(value))
+   if match is None:
+      raise ValueError('Invalid GeneralizedTime')
+   year, month, day, hour, minute, second, fraction, zone = match.groups()
+   result = '{}-{}-{} {}:{}:{}{}'.format(year, month, day, hour, minute or '00', second or '00', (fraction or '').replace(',', '.'))
+   if zone:
+      result += ' UTC' if zone == 'Z' else ' ' + zone
+   return result
+
+def _bcd_digits(value: bytes) -> str:
+   digits = value.hex()
+   if not digits.isdigit():
+      raise ValueError('Invalid BCD digits')
+   return digits
+
+def decode_numeric(value: bytes) -> str:
+   """ EMV n, BCD digits right justified with leading zeros """
+   return str(int(_bcd_digits(value))) if value else ''
+
+def decode_compressed_numeric(value: bytes) -> str:
+   """ EMV cn, BCD digits left justified, padded with F """
+   digits = value.hex().upper().rstrip('F')
+   if not digits.isdigit():
+      raise ValueError('Invalid compressed numeric')
+   return digits
+
+def decode_date(value: bytes) -> str:
+   """ EMV n6 YYMMDD """
+   digits = _bcd_digits(value)
+   if len(digits) != 6:
+      raise ValueError('Date must be YYMMDD')
+   return '20{}-{}-{}'.format(digits[0:2], digits[2:4], digits[4:6])
+
+def decode_time(value: bytes) -> str:
+   """ EMV n6 HHMMSS """
+   digits = _bcd_digits(value)
+   if len(digits) != 6:
+      raise ValueError('Time must be HHMMSS')
+   return '{}:{}:{}'.format(digits[0:2], digits[2:4], digits[4:6])
+
+def decode_track2(value: bytes) -> str:
+   """ BCD digits with D as field separator, padded with F """
+   return value.hex().upper().rstrip('F')
+
+
+class TagInfo:
+   __slots__ = ('name', 'decoder', 'primitive_type')
+
+   def __init__(self, name: str, decoder: Decoder|None = None, primitive_type: PrimitiveType|None = None) -> None:
+      self.name = name
+      self.decoder = decoder
+      self.primitive_type = primitive_type
+
+
+_UNIVERSAL_DECODERS: dict[PrimitiveType, Decoder] = {
+   PrimitiveType.BOOLEAN: decode_boolean,
+   PrimitiveType.INTEGER: decode_integer,
+   PrimitiveType.NULL: decode_null,
+   PrimitiveType.OBJECT_IDENTIFIER: decode_oid,
+   PrimitiveType.ENUMERATED: decode_integer,
+   PrimitiveType.UTF8_STRING: decode_utf8,
+   PrimitiveType.RELATIVE_OID: decode_relative_oid,
+   PrimitiveType.NUMERIC_STRING: decode_ascii,
+   PrimitiveType.PRINTABLE_STRING: decode_ascii,
+   PrimitiveType.T61_STRING: _string_decoder('latin-1'),
+   PrimitiveType.IA5_STRING: decode_ascii,
+   PrimitiveType.UTC_TIME: decode_utc_time,
+   PrimitiveType.GENERALIZED_TIME: decode_generalized_time,
+   PrimitiveType.VISIBLE_STRING: decode_ascii,
+   PrimitiveType.UNIVERSAL_STRING: _string_decoder('utf-32-be'),
+   PrimitiveType.BMP_STRING: _string_decoder('utf-16-be'),
+}
+
+def _universal_tags() -> dict[bytes, TagInfo]:
+   result = {}
+   # members, iterating an IntFlag only gives the single bit ones
+   for primitive_type in PrimitiveType.__members__.values():
+      if primitive_type == PrimitiveType.UNKNOWN:
+         continue
+      name = primitive_type.name.replace('_', ' ')
+      # primitive form, and constructed form without decoder
+      result[bytes([primitive_type])] = TagInfo(name, _UNIVERSAL_DECODERS.get(primitive_type), primitive_type)
+      result[bytes([0b0010_0000 | primitive_type])] = TagInfo(name, None, primitive_type)
+   return result
+
+X690_TAGS = _universal_tags()
+
+# raw tag, name and decoder of the common EMV tags, values without decoder are binary
+EMV_TAGS: dict[bytes, TagInfo] = {bytes.fromhex(raw_tag): TagInfo(name, decoder) for raw_tag, name, decoder in [
+   ('4F', 'Application Identifier', None),
+   ('50', 'Application Label', decode_ascii),
+   ('57', 'Track 2 Equivalent Data', decode_track2),
+   ('5A', 'Application PAN', decode_compressed_numeric),
+   ('5F20', 'Cardholder Name', decode_ascii),
+   ('5F24', 'Application Expiration Date', decode_date),
+   ('5F25', 'Application Effective Date', decode_date),
+   ('5F28', 'Issuer Country Code', decode_numeric),
+   ('5F2A', 'Transaction Currency Code', decode_numeric),
+   ('5F2D', 'Language Preference', decode_ascii),
+   ('5F30', 'Service Code', decode_numeric),
+   ('5F34', 'Application PAN Sequence Number', decode_numeric),
+   ('61', 'Application Template', None),
+   ('6F', 'FCI Template', None),
+   ('70', 'READ RECORD Response Message Template', None),
+   ('77', 'Response Message Template Format 2', None),
+   ('80', 'Response Message Template Format 1', None),
+   ('82', 'Application Interchange Profile', None),
+   ('84', 'Dedicated File Name', None),
+   ('87', 'Application Priority Indicator', None),
+   ('88', 'Short File Identifier', None),
+   ('8A', 'Authorisation Response Code', decode_ascii),
+   ('8C', 'CDOL1', None),
+   ('8D', 'CDOL2', None),
+   ('8E', 'Cardholder Verification Method CVM List', None),
+   ('8F', 'Certification Authority Public Key Index', None),
+   ('90', 'Issuer Public Key Certificate', None),
+   ('92', 'Issuer Public Key Remainder', None),
+   ('93', 'Signed Static Application Data', None),
+   ('94', 'Application File Locator AFL', None),
+   ('95', 'Terminal Verification Results', None),
+   ('9A', 'Transaction Date', decode_date),
+   ('9B', 'Transaction Status Information', None),
+   ('9C', 'Transaction Type', decode_numeric),
+   ('9F02', 'Amount, Authorised', decode_numeric),
+   ('9F03', 'Amount, Other', decode_numeric),
+   ('9F06', 'Terminal Application Identifier', None),
+   ('9F07', 'Application Usage Control', None),
+   ('9F08', 'Application Version Number', None),
+   ('9F0D', 'Issuer Action Code - Default', None),
+   ('9F0E', 'Issuer Action Code - Denial', None),
+   ('9F0F', 'Issuer Action Code - Online', None),
+   ('9F10', 'Issuer Application Data', None),
+   ('9F12', 'Application Preferred Name', decode_ascii),
+   ('9F1A', 'Terminal Country Code', decode_numeric),
+   ('9F1E', 'Interface Device Serial Number', decode_ascii),
+   ('9F21', 'Transaction Time', decode_time),
+   ('9F26', 'Application Cryptogram', None),
+   ('9F27', 'Cryptogram Information Data', None),
+   ('9F32', 'Issuer Public Key Exponent', None),
+   ('9F33', 'Terminal Capabilities', None),
+   ('9F34', 'Cardholder Verification Method CVM Results', None),
+   ('9F35', 'Terminal Type', decode_numeric),
+   ('9F36', 'Application Transaction Counter', None),
+   ('9F37', 'Unpredictable Number', None),
+   ('9F38', 'PDOL', None),
+   ('9F41', 'Transaction Sequence Counter', decode_numeric),
+   ('9F42', 'Application Currency Code', decode_numeric),
+   ('9F46', 'ICC Public Key Certificate', None),
+   ('9F47', 'ICC Public Key Exponent', None),
+   ('9F48', 'ICC Public Key Remainder', None),
+   ('9F4A', 'Static Data Authentication Tag List', None),
+   ('9F4B', 'Signed Dynamic Application Data', None),
+   ('9F4C', 'ICC Dynamic Number', None),
+   ('A5', 'FCI Proprietary Template', None),
+   ('BF0C', 'FCI Issuer Discretionary Data', None),
+]}
+
+
+class TagDictionary:
+   """
+      Tag names and value decoders, looked up by raw tag bytes.
+      Decoded values are memoized by tag and value, so repeated values
+      like OIDs are only decoded once
+   """
+   # decoded values kept
+   MEMO_SIZE = 64 * 1024
+   # longer values are decoded each time instead of being kept
+   MEMO_MAX_VALUE = 64
+
+   def __init__(self, *tables: dict[bytes, TagInfo]) -> None:
+      self._entries: dict[bytes, TagInfo] = {}
+      for table in tables:
+         self._entries.update(table)
+      self._memo: dict[tuple[bytes, bytes], str|None] = {}
+
+   def register(self, raw_tag: bytes, name: str, decoder: Decoder|None = None):
+      """ adds or replaces the entry of a tag, e.g. for proprietary tags """
+      self._entries[bytes(raw_tag)] = TagInfo(name, decoder)
+      self._memo.clear()
+
+   def lookup(self, tag: Tag) -> TagInfo|None:
+      return self._entries.get(bytes(tag.raw))
+
+   def get_name(self, tag: Tag) -> str|None:
+      info = self.lookup(tag)
+      return None if info is None else info.name
+
+   def decode(self, tag: Tag, value: bytes|bytearray|memoryview) -> str|None:
+      """ readable value, None if the tag has no decoder or the value is invalid """
+      raw_tag = bytes(tag.raw)
+      info = self._entries.get(raw_tag)
+      if info is None or info.decoder is None:
+         return None
+      if len(value) > self.MEMO_MAX_VALUE:
+         return self._decode(raw_tag, bytes(value))
+      key = (raw_tag, bytes(value))
+      try:
+         return self._memo[key]
+      except KeyError:
+         pass
+      if len(self._memo) >= self.MEMO_SIZE:
+         self._memo.clear()
+      decoded = self._memo[key] = self._decode(*key)
+      return decoded
+
+   def _decode(self, raw_tag: bytes, value: bytes) -> str|None:
+      info = self._entries.get(raw_tag)
+      if info is None or info.decoder is None:
+         return None
+      try:
+         return info.decoder(value)
+      except ValueError:
+         return None
+
+
+def create_dictionary(name: str) -> TagDictionary:
+   """ x690, emv or all """
+   match name:
+      case 'x690':
+         return TagDictionary(X690_TAGS)
+      case 'emv':
+         return TagDictionary(EMV_TAGS)
+      case 'all':
+         return TagDictionary(X690_TAGS, EMV_TAGS)
+   raise ValueError(f'Unknown tag dictionary: {name}')
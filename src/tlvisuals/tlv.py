@@ -1,6 +1,7 @@
 
 
 from enum import IntFlag
+from typing import Callable
 
 
 class TagClass(IntFlag):
@@ -35,41 +36,105 @@ class TagType(IntFlag):
 
 
 class PrimitiveType(IntFlag):
+   """ X.690 universal tag numbers, 0 is also the end-of-contents """
    UNKNOWN = 0
    BOOLEAN = 1
+   INTEGER = 2
+   BIT_STRING = 3
+   OCTET_STRING = 4
+   NULL = 5
+   OBJECT_IDENTIFIER = 6
+   OBJECT_DESCRIPTOR = 7
+   EXTERNAL = 8
+   REAL = 9
+   ENUMERATED = 10
+   EMBEDDED_PDV = 11
+   UTF8_STRING = 12
+   RELATIVE_OID = 13
+   TIME = 14
+   SEQUENCE = 16
+   SET = 17
+   NUMERIC_STRING = 18
+   PRINTABLE_STRING = 19
+   T61_STRING = 20
+   VIDEOTEX_STRING = 21
+   IA5_STRING = 22
+   UTC_TIME = 23
+   GENERALIZED_TIME = 24
+   GRAPHIC_STRING = 25
+   VISIBLE_STRING = 26
+   GENERAL_STRING = 27
+   UNIVERSAL_STRING = 28
+   CHARACTER_STRING = 29
+   BMP_STRING = 30
    
 
 
 
 class Tag:
-   def __init__(self, cla : TagClass, type: TagType, tag_number: int, raw: bytearray) -> None:
-      self.cla = cla
-      self.type = type
-      self.tag_number = tag_number
-      self.raw = raw
+   """
+   immutable, parsed tags are interned and shared by all the TLVs with the
+   same tag, so a TLV is edited by replacing its tag
+   """
+   __slots__ = ('cla', 'type', 'tag_number', 'raw')
+
+   def __init__(self, cla : TagClass, type: TagType, tag_number: int, raw: bytes|bytearray|memoryview) -> None:
+      object.__setattr__(self, 'cla', cla)
+      object.__setattr__(self, 'type', type)
+      object.__setattr__(self, 'tag_number', tag_number)
+      object.__setattr__(self, 'raw', raw)
+
+   def __setattr__(self, name: str, value) -> None:
+      raise AttributeError(f'Tag is immutable, replace the tag of the TLV instead of setting {name}')
+
+   def __delattr__(self, name: str) -> None:
+      raise AttributeError(f'Tag is immutable, can\'t delete {name}')
+
+   def __reduce__(self):
+      # memoryview slices can't be pickled, e.g. to send TLVs to other processes
+      return (Tag, (self.cla, self.type, self.tag_number, bytes(self.raw)))
 
 class Length:
-   def __init__(self, length: int, raw: bytearray) -> None:
+   """
+   for the indefinite form, length is the length of the contents without
+   the end-of-contents, None until the end-of-contents is found
+   """
+   __slots__ = ('length', 'raw', 'indefinite')
+
+   def __init__(self, length: int|None, raw: bytes|bytearray|memoryview, indefinite: bool = False) -> None:
       self.length = length
       self.raw = raw
+      self.indefinite = indefinite
+
+   def __reduce__(self):
+      return (Length, (self.length, bytes(self.raw), self.indefinite))
 
 class Value:
+   __slots__ = ()
+
    def get_raw(self) -> bytes:
       raise NotImplementedError()
 
 class PrimitiveValue(Value):
-   def __init__(self, raw: bytearray|None) -> None:
+   __slots__ = ('raw',)
+
+   def __init__(self, raw: bytes|bytearray|memoryview|None) -> None:
       self.raw = bytearray() if raw is None  else raw
 
    def get_raw(self) -> bytes:
       return self.raw
 
+   def __reduce__(self):
+      return (PrimitiveValue, (bytes(self.raw),))
+
 
 class TLV:
    """
    value should be objects deriving Value class, or none
    none represents length of 0
    """
+   __slots__ = ('tag', 'length', 'value')
+
    def __init__(self, tag:Tag, length:Length, value: Value|None = None) -> None:
       self.tag = tag
       self.length = length
@@ -77,5 +142,46 @@ class TLV:
 
 
 class ConstructedValue(Value):
+   """
+   children can also be deferred, see deferred()
+   """
+   __slots__ = ('_children', 'source', '_load_children')
+
    def __init__(self, children: list[TLV]|None=None) -> None:
-      self.children = [] if children is None  else children
+      self._children = [] if children is None  else children
+      # bytes the children were parsed from, None if built in memory
+      self.source = None
+      self._load_children = None
+
+   @staticmethod
+   def deferred(source: memoryview, load_children: Callable[[memoryview], list[TLV]]) -> 'ConstructedValue':
+      """
+      only records the bytes of the children, they are parsed
+      by load_children the first time children is accessed
+      """
+      value = ConstructedValue()
+      value._children = None
+      value.source = source
+      value._load_children = load_children
+      return value
+
+   def __reduce__(self):
+      # deferred children are parsed, the parse function can't be pickled
+      return (ConstructedValue, (self.children,))
+
+   def is_loaded(self) -> bool:
+      return self._children is not None
+
+   @property
+   def children(self) -> list[TLV]:
+      if self._children is None:
+         self._children = self._load_children(self.source)
+         self._load_children = None
+      return self._children
+
+   @children.setter
+   def children(self, children: list[TLV]):
+      self._children = children
+      self._load_children = None
+      # the parsed bytes no longer match the children
+      self.source = None
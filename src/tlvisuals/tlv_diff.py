@@ -0,0 +1,118 @@
+from enum import IntFlag
+from typing import Iterator
+from tlvisuals.tlv import *
+from tlvisuals.tlv_parser import TLVParser, DiagnosticsCollector
+
+
+class DiffType(IntFlag):
+   ADDED = 0
+   REMOVED = 1
+   CHANGED = 2
+
+
+class TLVDiff:
+   """
+   TLV found different by diff_tlvs, old is the TLV of the first tree,
+   None if added, and new the one of the second tree, None if removed.
+   Offsets are where the TLVs start in their input
+   """
+   __slots__ = ('type', 'path', 'old', 'old_offset', 'new', 'new_offset')
+
+   def __init__(self, type: DiffType, path: str, old: TLV|None, old_offset: int|None, new: TLV|None, new_offset: int|None) -> None:
+      self.type = type
+      self.path = path
+      self.old = old
+      self.old_offset = old_offset
+      self.new = new
+      self.new_offset = new_offset
+
+
+# bytes compared at a time, so large values aren't copied whole
+COMPARE_CHUNK = 1024 * 1024
+
+def _equal_bytes(a: bytes|bytearray|memoryview, b: bytes|bytearray|memoryview) -> bool:
+   if len(a) != len(b):
+      return False
+   for i in range(0, len(a), COMPARE_CHUNK):
+      if bytes(a[i:i+COMPARE_CHUNK]) != bytes(b[i:i+COMPARE_CHUNK]):
+         return False
+   return True
+
+
+def _content(tlv: TLV) -> bytes|bytearray|memoryview|None:
+   """ bytes of the value, of the children for constructed TLVs, None if not parsed from bytes """
+   if tlv.value is None:
+      return b''
+   if tlv.tag.type == TagType.PRIMITIVE:
+      return tlv.value.get_raw()
+   return tlv.value.source
+
+def _children(tlv: TLV) -> list[TLV]:
+   return [] if tlv.value is None else tlv.value.children
+
+def _keyed(tlvs: list[TLV], offset: int, path: str) -> dict[str, tuple[TLV, int]]:
+   """ TLVs with their offset, by their path made of the tag and its occurrence among siblings """
+   result = {}
+   occurrences: dict[bytes, int] = {}
+   for tlv in tlvs:
+      raw_tag = bytes(tlv.tag.raw)
+      occurrence = occurrences.get(raw_tag, 0)
+      occurrences[raw_tag] = occurrence + 1
+      result['{}{}[{}]'.format(path, raw_tag.hex().upper(), occurrence)] = (tlv, offset)
+      content = _content(tlv)
+      content_len = (tlv.length.length or 0) if content is None else len(content)
+      offset += len(tlv.tag.raw) + len(tlv.length.raw) + content_len + (2 if tlv.length.indefinite else 0)
+   return result
+
+
+def diff_tlvs(old: list[TLV], new: list[TLV]) -> Iterator[TLVDiff]:
+   """
+      Walks both trees in parallel, matching TLVs by tag path, and yields the
+      removed, changed and added TLVs in preorder, the added ones after the
+      other TLVs of their level. Matching TLVs whose whole bytes are equal are
+      skipped without descending, so with trees from lazy parsing only the
+      children of the different constructed TLVs are ever parsed. Constructed
+      TLVs are reported as changed when their length differs, the differences
+      of their children follow
+   """
+   # matched paths left to compare, and TLVs of both sides, of each open level
+   stack = [_open_level(old, 0, new, 0, '')]
+   while stack:
+      old_paths, old_items, new_items = stack[-1]
+      path = next(old_paths, None)
+      if path is None:
+         stack.pop()
+         for path, (new_tlv, new_offset) in new_items.items():
+            if path not in old_items:
+               yield TLVDiff(DiffType.ADDED, path, None, None, new_tlv, new_offset)
+         continue
+
+      old_tlv, old_offset = old_items[path]
+      if path not in new_items:
+         yield TLVDiff(DiffType.REMOVED, path, old_tlv, old_offset, None, None)
+         continue
+      new_tlv, new_offset = new_items[path]
+      old_content, new_content = _content(old_tlv), _content(new_tlv)
+      same_content = old_content is not None and new_content is not None and _equal_bytes(old_content, new_content)
+      if bytes(old_tlv.length.raw) != bytes(new_tlv.length.raw) or (not same_content and old_tlv.tag.type == TagType.PRIMITIVE):
+         yield TLVDiff(DiffType.CHANGED, path, old_tlv, old_offset, new_tlv, new_offset)
+      if not same_content and old_tlv.tag.type != TagType.PRIMITIVE:
+         stack.append(_open_level(
+            _children(old_tlv), old_offset + len(old_tlv.tag.raw) + len(old_tlv.length.raw),
+            _children(new_tlv), new_offset + len(new_tlv.tag.raw) + len(new_tlv.length.raw),
+            path + '/'))
+
+
+def _open_level(old: list[TLV], old_offset: int, new: list[TLV], new_offset: int, path: str):
+   old_items = _keyed(old, old_offset, path)
+   return iter(list(old_items)), old_items, _keyed(new, new_offset, path)
+
+
+def diff_buffers(
+      old: bytes|bytearray|memoryview,
+      new: bytes|bytearray|memoryview,
+      diagnostic_collector: DiagnosticsCollector|None = None
+      ) -> Iterator[TLVDiff]:
+   """ diff_tlvs of both buffers parsed lazily, diagnostics of both are added to the collector """
+   parser = TLVParser(diagnostic_collector=diagnostic_collector)
+   return diff_tlvs(parser.parse_buffer(old, lazy=True), parser.parse_buffer(new, lazy=True))
@@ -0,0 +1,116 @@
+from typing import BinaryIO
+from tlvisuals.tlv import *
+
+
+def encode_length(length: int) -> bytes:
+   """ definite length in its shortest form """
+   if length < 0b1000_0000:
+      return bytes((length,))
+   length_bytes = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+   return bytes((0b1000_0000 | len(length_bytes),)) + length_bytes
+
+
+class TLVEncoder:
+   """
+      Writes TLV trees back as bytes. Lengths of all constructed TLVs are
+      computed in one bottom-up pass, then the TLVs are copied in a single
+      preallocated bytearray. Lengths are taken from the values, not from
+      Length.length, so edited trees are written with consistent lengths.
+
+      Unchanged parts reuse their original bytes: the children bytes of lazy
+      values never loaded, and the raw length when it still matches. Loaded
+      children are encoded again since they may have been edited.
+      Indefinite lengths are written as 80 with an end-of-contents.
+
+      Tags are immutable and shared by the TLVs with the same tag, a tag is
+      edited by replacing tlv.tag, e.g. with intern_tag
+   """
+
+   def _get_children(self, tlv: TLV) -> list[TLV]|None:
+      """ children to encode, None if the value bytes are copied as they are """
+      value = tlv.value
+      if value is None or tlv.tag.type == TagType.PRIMITIVE:
+         return None
+      if not value.is_loaded():
+         return None
+      return value.children
+
+   def _get_raw_value(self, tlv: TLV) -> bytes|bytearray|memoryview:
+      value = tlv.value
+      if value is None:
+         return b''
+      if tlv.tag.type == TagType.PRIMITIVE:
+         if tlv.length.indefinite:
+            raise ValueError(f'Indefinite length is not allowed for primitive TLV: {tlv.tag.raw.hex()}')
+         return value.get_raw()
+      return value.source
+
+   def _get_raw_length(self, tlv: TLV, content_len: int) -> bytes|bytearray|memoryview:
+      length = tlv.length
+      if length.indefinite:
+         return b'\x80'
+      if length.length == content_len and len(length.raw) > 0:
+         return length.raw
+      return encode_length(content_len)
+
+   def encode(self, input: list[TLV]) -> bytearray:
+      # preorder list of the TLVs, with the index of their parent and the
+      # bytes of their value, None when their children are encoded
+      tlvs: list[TLV] = []
+      parents: list[int] = []
+      raw_values: list[bytes|bytearray|memoryview|None] = []
+      stack = [(iter(input), -1)]
+      while stack:
+         tlv = next(stack[-1][0], None)
+         if tlv is None:
+            stack.pop()
+            continue
+         tlvs.append(tlv)
+         parents.append(stack[-1][1])
+         children = self._get_children(tlv)
+         if children is None:
+            raw_values.append(self._get_raw_value(tlv))
+         else:
+            raw_values.append(None)
+            stack.append((iter(children), len(tlvs) - 1))
+
+      # walked in reverse so each TLV comes after its descendants,
+      # whose sizes are added to the content length of their parent
+      content_lens = [0 if raw_value is None else len(raw_value) for raw_value in raw_values]
+      raw_lengths: list[bytes|bytearray|memoryview] = [b''] * len(tlvs)
+      total = 0
+      for i in range(len(tlvs) - 1, -1, -1):
+         tlv = tlvs[i]
+         raw_lengths[i] = raw_length = self._get_raw_length(tlv, content_lens[i])
+         size = len(tlv.tag.raw) + len(raw_length) + content_lens[i]
+         if tlv.length.indefinite:
+            size += 2
+         if parents[i] == -1:
+            total += size
+         else:
+            content_lens[parents[i]] += size
+
+      # zero filled, so end-of-contents are already in place
+      output = bytearray(total)
+      # end of the contents of the open indefinite lengths, and offset after their end-of-contents
+      ends: list[tuple[int, int]] = []
+      pos = 0
+      for i, tlv in enumerate(tlvs):
+         while ends and ends[-1][0] <= pos:
+            pos = ends.pop()[1]
+         raw_tag = tlv.tag.raw
+         output[pos:pos+len(raw_tag)] = raw_tag
+         pos += len(raw_tag)
+         raw_length = raw_lengths[i]
+         output[pos:pos+len(raw_length)] = raw_length
+         pos += len(raw_length)
+         if tlv.length.indefinite:
+            ends.append((pos + content_lens[i], pos + content_lens[i] + 2))
+         raw_value = raw_values[i]
+         if raw_value is not None:
+            output[pos:pos+len(raw_value)] = raw_value
+            pos += len(raw_value)
+      return output
+
+   def encode_on_output(self, input: list[TLV], output: BinaryIO):
+      output.write(self.encode(input))
@@ -0,0 +1,124 @@
+from typing import Iterator
+from tlvisuals.tlv_parser import DiagnosticsCollector, read_length, read_tag_end, to_buffer
+from tlvisuals.tlv_index import parse_path
+
+
+class TagMatch:
+   """
+   TLV found by find_tags, value is the slice of a primitive value
+   over the input, None for constructed TLVs
+   """
+   __slots__ = ('offset', 'path', 'tag', 'length', 'value')
+
+   def __init__(self, offset: int, path: str, tag: memoryview, length: memoryview, value: memoryview|None) -> None:
+      self.offset = offset
+      self.path = path
+      self.tag = tag
+      self.length = length
+      self.value = value
+
+
+def parse_pattern(pattern: str) -> tuple[bool, list[tuple[bytes, int|None]]]:
+   """
+      A pattern is a tag path like 70/5A or 30/A1[3]/04, matching the TLVs
+      whose path ends with it, or only from the top level if it starts with '/'
+   """
+   return pattern.startswith('/'), parse_path(pattern)
+
+
+def _matches(pattern: tuple[bool, list[tuple[bytes, int|None]]], path: list[tuple[bytes, int]]) -> bool:
+   anchored, segments = pattern
+   if len(segments) > len(path) or (anchored and len(segments) != len(path)):
+      return False
+   for (raw_tag, occurrence), (path_tag, path_occurrence) in zip(segments, path[len(path) - len(segments):]):
+      if raw_tag != path_tag or (occurrence is not None and occurrence != path_occurrence):
+         return False
+   return True
+
+
+def _format_path(path: list[tuple[bytes, int]]) -> str:
+   return '/'.join('{}[{}]'.format(raw_tag.hex().upper(), occurrence) for raw_tag, occurrence in path)
+
+
+def find_tags(
+      buffer: bytes|bytearray|memoryview,
+      patterns: list[str],
+      diagnostic_collector: DiagnosticsCollector|None = None
+      ) -> Iterator[TagMatch]:
+   """
+      Walks the headers only and yields the TLVs matching any of the patterns,
+      in preorder. No TLV objects are built, values are skipped by their
+      lengths and only sliced for matches. Like the index, constructed lengths
+      are trusted and the walk stops at the first header that can't be read
+   """
+   if diagnostic_collector is None:
+      diagnostic_collector = DiagnosticsCollector()
+   parsed_patterns = [parse_pattern(pattern) for pattern in patterns]
+   # tags ending a pattern, other headers are only counted
+   last_tags = {segments[-1][0] for _, segments in parsed_patterns}
+
+   buffer = to_buffer(buffer)
+   buffer_len = len(buffer)
+   # tag and occurrence of the open constructed TLVs, and of the current one last
+   path = [(b'', 0)]
+   # end of the open levels, None for indefinite lengths, with their tag occurrences
+   stack = []
+   end, occurrences = buffer_len, {}
+   pos = 0
+   while True:
+      if end is not None and pos >= end:
+         if not stack:
+            return
+         pos = end
+         end, occurrences = stack.pop()
+         path.pop()
+         continue
+
+      start = pos
+      if pos >= buffer_len:
+         if end is None:
+            diagnostic_collector.add_error(f'Unexpected EOF, end-of-contents not found for indefinite length TLV: {path[-2][0].hex()}')
+         else:
+            diagnostic_collector.add_error(f'Unexpected EOF when parsing header at offset {start}')
+         return
+      tag_end = read_tag_end(buffer, pos)
+      header = read_length(buffer, tag_end)
+      if header is None:
+         diagnostic_collector.add_error(f'Unexpected EOF when parsing header at offset {start}')
+         return
+      length, pos = header
+      first = buffer[start]
+
+      if end is None and length == 0 and pos - start == 2 and first == 0:
+         # end-of-contents of the indefinite length level
+         end, occurrences = stack.pop()
+         path.pop()
+         continue
+
+      constructed = first & 0b0010_0000 != 0
+      if length is None and not constructed:
+         diagnostic_collector.add_error(f'Indefinite length is not allowed for primitive TLV: {buffer[start:tag_end].hex()}')
+         return
+
+      raw_tag = bytes(buffer[start:tag_end])
+      occurrence = occurrences.get(raw_tag, 0)
+      occurrences[raw_tag] = occurrence + 1
+      path[-1] = (raw_tag, occurrence)
+
+      value_end = buffer_len if length is None else pos + length
+      if not constructed and value_end > buffer_len:
+         diagnostic_collector.add_error(f'Unexpected EOF while parsing value at offset {start}')
+      if raw_tag in last_tags and any(_matches(pattern, path) for pattern in parsed_patterns):
+         yield TagMatch(start, _format_path(path), buffer[start:tag_end], buffer[tag_end:pos],
+                        None if constructed else buffer[pos:value_end])
+
+      if constructed and length != 0:
+         stack.append((end, occurrences))
+         path.append((b'', 0))
+         if length is None:
+            end = None
+         else:
+            end = value_end if stack[-1][0] is None else min(value_end, stack[-1][0])
+         occurrences = {}
+      else:
+         pos = value_end
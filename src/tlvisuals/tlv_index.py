@@ -0,0 +1,239 @@
+import os
+import re
+import struct
+import sys
+from array import array
+from tlvisuals.tlv import TLV, TagType
+from tlvisuals.tlv_parser import TLVParser, DiagnosticsCollector, to_buffer
+
+
+class IndexFormatException(Exception):
+   pass
+
+
+class TLVIndex:
+   """
+   Offsets of every TLV of a DER buffer, in preorder, to parse
+   only the subtrees found by a tag path instead of the whole input.
+   Entries are stored in arrays, the tag of each entry is an index
+   into the list of distinct raw tags
+   """
+   SUFFIX = '.tlvidx'
+   _MAGIC = b'TLVIDX'
+   _VERSION = 2
+   # version, byte order, source size, source mtime, number of entries, number of tags
+   _HEADER = struct.Struct('<BBqqqq')
+   _MAX_LENGTH = 2**63 - 1
+
+   def __init__(self) -> None:
+      self.tags: list[bytes] = []
+      self.tag_ids = array('I')
+      self.offsets = array('q')
+      self.header_lens = array('I')
+      self.value_lens = array('q')
+      self.parents = array('q')
+      # number of entries in the subtree of each entry, to skip to the next sibling
+      self.subtree_sizes = array('q')
+      # occurrence of the tag of each entry among its siblings, for its path
+      self.occurrences = array('q')
+
+   def __len__(self) -> int:
+      return len(self.offsets)
+
+   @staticmethod
+   def build(buffer: bytes|bytearray|memoryview, diagnostic_collector: DiagnosticsCollector|None = None) -> 'TLVIndex':
+      """
+         Walks the headers only, values are skipped by their lengths.
+         Like lazy parsing, constructed lengths are trusted and children
+         exceeding them are cut off at the parent end. Value lengths of
+         indefinite length TLVs include the end-of-contents
+      """
+      buffer = to_buffer(buffer)
+      scanner = TLVParser(diagnostic_collector=diagnostic_collector)
+      index = TLVIndex()
+      tag_ids = {}
+
+      # end of the children, entry, offset after the enclosing constructed TLVs,
+      # and number of siblings seen per tag id
+      stack = []
+      end, parent, next_pos, occurrences = len(buffer), -1, len(buffer), {}
+      pos = 0
+      while True:
+         if pos >= end:
+            if not stack:
+               break
+            index.subtree_sizes[parent] = len(index) - parent - 1
+            pos = next_pos
+            end, parent, next_pos, occurrences = stack.pop()
+            continue
+
+         offset = pos
+         tag, pos = scanner._parse_tag_buffer(buffer, pos, None, 0)
+         if tag is None:
+            break
+         length, pos = scanner._parse_length_buffer(buffer, pos, None, 0)
+         if length is None:
+            break
+         if not scanner._check_indefinite(TLV(tag, length)):
+            break
+
+         value_end = pos + (length.length or 0)
+         if length.indefinite:
+            end_of_contents = scanner._find_end_of_contents(buffer, pos)
+            if end_of_contents is None:
+               scanner.diagnostic_collector.add_error(f'Unexpected EOF, end-of-contents not found for indefinite length TLV: {tag.raw.hex()}')
+               children_end = value_end = len(buffer)
+            else:
+               children_end, value_end = end_of_contents, end_of_contents + 2
+         else:
+            children_end = value_end
+
+         raw_tag = bytes(tag.raw)
+         tag_id = tag_ids.get(raw_tag)
+         if tag_id is None:
+            tag_id = tag_ids[raw_tag] = len(index.tags)
+            index.tags.append(raw_tag)
+         entry = len(index)
+         index.tag_ids.append(tag_id)
+         index.offsets.append(offset)
+         index.header_lens.append(pos - offset)
+         index.value_lens.append(min(value_end - pos, TLVIndex._MAX_LENGTH))
+         index.parents.append(parent)
+         index.subtree_sizes.append(0)
+         occurrence = occurrences.get(tag_id, 0)
+         occurrences[tag_id] = occurrence + 1
+         index.occurrences.append(occurrence)
+
+         if tag.type == TagType.CONSTRUCTED and children_end > pos:
+            stack.append((end, parent, next_pos, occurrences))
+            end, parent, next_pos, occurrences = min(children_end, end), entry, min(value_end, end), {}
+         else:
+            pos = value_end
+
+      # close the levels left open by EOF
+      while stack:
+         index.subtree_sizes[parent] = len(index) - parent - 1
+         end, parent, next_pos, occurrences = stack.pop()
+      return index
+
+   def get_range(self, entry: int) -> tuple[int, int]:
+      """ start and end offset of the whole TLV of the entry """
+      start = self.offsets[entry]
+      return start, start + self.header_lens[entry] + self.value_lens[entry]
+
+   def get_path(self, entry: int) -> str:
+      """ path of the entry, with the occurrence index of each tag among its siblings """
+      segments = []
+      while entry != -1:
+         segments.append('{}[{}]'.format(self.tags[self.tag_ids[entry]].hex().upper(), self.occurrences[entry]))
+         entry = self.parents[entry]
+      return '/'.join(reversed(segments))
+
+   def _children(self, parent: int):
+      if parent == -1:
+         child, end = 0, len(self)
+      else:
+         child, end = parent + 1, parent + 1 + self.subtree_sizes[parent]
+      while child < end:
+         yield child
+         child += 1 + self.subtree_sizes[child]
+
+   def find(self, path: str) -> list[int]:
+      """
+         Entries matching a path of hex tags separated by '/', e.g. 30/A1[3]/04.
+         [n] selects only the n-th (from 0) occurrence of the tag among its
+         siblings, without it every occurrence matches
+      """
+      matches = [-1]
+      for raw_tag, occurrence in parse_path(path):
+         next_matches = []
+         for parent in matches:
+            for child in self._children(parent):
+               if self.tags[self.tag_ids[child]] == raw_tag and (occurrence is None or occurrence == self.occurrences[child]):
+                  next_matches.append(child)
+         matches = next_matches
+      return matches
+
+   def save(self, path: str, source_size: int, source_mtime: int):
+      with open(path, 'wb') as f:
+         f.write(self._MAGIC)
+         f.write(self._HEADER.pack(self._VERSION, sys.byteorder == 'little', source_size, source_mtime, len(self), len(self.tags)))
+         for tag in self.tags:
+            f.write(struct.pack('<H', len(tag)))
+            f.write(tag)
+         for values in self._arrays():
+            values.tofile(f)
+
+   @staticmethod
+   def load(path: str) -> tuple['TLVIndex', int, int]:
+      """ returns the index, and the size and mtime of the source it was built from """
+      with open(path, 'rb') as f:
+         if f.read(len(TLVIndex._MAGIC)) != TLVIndex._MAGIC:
+            raise IndexFormatException(f'Not an index file: {path}')
+         header = f.read(TLVIndex._HEADER.size)
+         if len(header) != TLVIndex._HEADER.size:
+            raise IndexFormatException(f'Truncated index file: {path}')
+         version, little_endian, source_size, source_mtime, entries, tag_count = TLVIndex._HEADER.unpack(header)
+         if version != TLVIndex._VERSION:
+            raise IndexFormatException(f'Unsupported index version {version}: {path}')
+
+         index = TLVIndex()
+         try:
+            for _ in range(tag_count):
+               tag_len, = struct.unpack('<H', f.read(2))
+               index.tags.append(f.read(tag_len))
+            for values in index._arrays():
+               values.fromfile(f, entries)
+         except (struct.error, EOFError):
+            raise IndexFormatException(f'Truncated index file: {path}')
+
+      if little_endian != (sys.byteorder == 'little'):
+         for values in index._arrays():
+            values.byteswap()
+      return index, source_size, source_mtime
+
+   def _arrays(self) -> list[array]:
+      return [self.tag_ids, self.offsets, self.header_lens, self.value_lens, self.parents, self.subtree_sizes, self.occurrences]
+
+
+_PATH_SEGMENT_REGX = re.compile(r'([0-9a-fA-F]+)(?:\[(\d+)\])?')
+
+def parse_path(path: str) -> list[tuple[bytes, int|None]]:
+   """ splits a path like 30/A1[3]/04 into raw tags and occurrence indexes """
+   result = []
+   for segment in path.strip('/').split('/'):
+      match = _PATH_SEGMENT_REGX.fullmatch(segment.strip())
+      if match is None or len(match.group(1)) % 2 != 0:
+         raise ValueError(f'Invalid path segment: {segment}')
+      occurrence = None if match.group(2) is None else int(match.group(2))
+      result.append((bytes.fromhex(match.group(1)), occurrence))
+   return result
+
+
+def open_index(file_path: str, buffer: memoryview, index_path: str|None = None, rebuild: bool = False) -> TLVIndex:
+   """
+      Loads the index of the file from its sidecar file, which defaults
+      to the file path with TLVIndex.SUFFIX. The index is built and saved
+      if missing, or if the file changed since it was built
+   """
+   if index_path is None:
+      index_path = file_path + TLVIndex.SUFFIX
+   stat = os.stat(file_path)
+   if not rebuild and os.path.exists(index_path):
+      try:
+         index, source_size, source_mtime = TLVIndex.load(index_path)
+         if source_size == stat.st_size and source_mtime == stat.st_mtime_ns:
+            return index
+      except IndexFormatException:
+         pass
+
+   index = TLVIndex.build(buffer)
+   index.save(index_path, stat.st_size, stat.st_mtime_ns)
+   return index
+
+
+def parse_entry(buffer: memoryview, index: TLVIndex, entry: int, diagnostic_collector: DiagnosticsCollector|None = None) -> list[TLV]:
+   """ parses only the subtree of the entry """
+   start, stop = index.get_range(entry)
+   parser = TLVParser(diagnostic_collector=diagnostic_collector)
+   return parser.parse_buffer(buffer[start:stop])
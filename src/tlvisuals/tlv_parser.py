@@ -1,36 +1,129 @@
 
 import io
+import mmap
+import os
 import re
-from typing import Iterator
+from enum import IntFlag
+from typing import TYPE_CHECKING, Iterator
 from tlvisuals.tlv import TLV,Tag,Length,Value,TagClass,TagType,PrimitiveValue,ConstructedValue
+if TYPE_CHECKING:
+   from tlvisuals.instrumentation import ParseStats
 
 class ByteGetter(Iterator[int]):
+   """
+      Decodes ASCII hex from a text stream, ignoring whitespaces.
+      Reads the stream in blocks of chunk_size chars and decodes each block
+      with a single bytes.fromhex call
+   """
+   CHUNK_SIZE = 64 * 1024
 
-   def __init__(self, stream: io.TextIOBase):
+   _non_hex_regx = re.compile(r'[^0-9a-fA-F]')
+
+   def __init__(self, stream: io.TextIOBase, chunk_size: int = CHUNK_SIZE):
       self._stream = stream
-      self.whitespace_regx = re.compile(r'\s')
+      self._chunk_size = chunk_size
+      # current chunk as read from the stream, and its offset in the stream
+      self._chunk = ''
+      self._chunk_offset = 0
+      self._offset = 0
+      # hex chars of the current chunk without whitespaces, prefixed by the
+      # odd char left from the previous chunk if any
+      self._hex = ''
+      self._hex_pos = 0
+      self._carry_len = 0
+      self._carry_offset = 0
+      # decoded bytes not yet returned by __next__
+      self._decoded = b''
+      self._decoded_pos = 0
 
    def __iter__(self) -> Iterator[int]:
       return self
 
    def __next__(self) -> int:
-      byte = ''
-      cur = self._stream.read(1)
-      while cur != None and cur != '':
-         if not self.whitespace_regx.match(cur):
-            byte += cur
-         if len(byte) == 2:
-            try:
-               b = bytes.fromhex(byte)
-               return b[0]
-            except:
-               raise ValueError("Invalid hex found " + byte)
-         cur = self._stream.read(1)
-      
-      if len(byte) != 0:
-         raise ValueError("Odd number of chars found")
-      
-      raise StopIteration()
+      while self._decoded_pos >= len(self._decoded):
+         self._decoded = self._decode_block()
+         self._decoded_pos = 0
+         if not self._decoded:
+            raise StopIteration()
+      cur = self._decoded[self._decoded_pos]
+      self._decoded_pos += 1
+      return cur
+
+   def __bytes__(self) -> bytes:
+      blocks = []
+      block = self.read_block()
+      while block:
+         blocks.append(block)
+         block = self.read_block()
+      return b''.join(blocks)
+
+   def read_block(self) -> bytes:
+      """
+         Returns the next block of decoded bytes, or empty bytes once
+         the stream is exhausted
+      """
+      if self._decoded_pos < len(self._decoded):
+         block = self._decoded[self._decoded_pos:]
+         self._decoded = b''
+         self._decoded_pos = 0
+         return block
+      return self._decode_block()
+
+   def _read_chunk(self) -> bool:
+      chunk = self._stream.read(self._chunk_size)
+      if not chunk:
+         return False
+      # at most one char is left over, the first of an incomplete pair
+      carry = self._hex[self._hex_pos:]
+      if carry:
+         self._carry_offset = self._char_offset(self._hex_pos)
+      self._carry_len = len(carry)
+      self._chunk = chunk
+      self._chunk_offset = self._offset
+      self._offset += len(chunk)
+      # split() drops the same whitespaces as the '\s' regex
+      self._hex = carry + ''.join(chunk.split())
+      self._hex_pos = 0
+      return True
+
+   def _char_offset(self, index: int) -> int:
+      """ offset in the stream of the char at index of self._hex, only needed on errors """
+      if index < self._carry_len:
+         return self._carry_offset
+      index -= self._carry_len
+      for i, cur in enumerate(self._chunk):
+         if not cur.isspace():
+            if index == 0:
+               return self._chunk_offset + i
+            index -= 1
+      return self._offset
+
+   def _decode_block(self) -> bytes:
+      while len(self._hex) - self._hex_pos < 2:
+         if not self._read_chunk():
+            if self._hex_pos < len(self._hex):
+               offset = self._char_offset(self._hex_pos)
+               self._hex_pos = len(self._hex)
+               raise ValueError(f'Odd number of chars found at offset {offset}')
+            return b''
+
+      start = self._hex_pos
+      stop = len(self._hex) - (len(self._hex) - start) % 2
+      block = self._hex[start:stop]
+      try:
+         result = bytes.fromhex(block)
+      except ValueError:
+         invalid = self._non_hex_regx.search(block).start()
+         pair_start = invalid - invalid % 2
+         if pair_start > 0:
+            # return the valid bytes first, error is raised on the next call
+            self._hex_pos = start + pair_start
+            return bytes.fromhex(block[:pair_start])
+         # skip the invalid pair, so decoding can continue after it
+         self._hex_pos = start + 2
+         raise ValueError(f'Invalid hex found {block[:2]} at offset {self._char_offset(start + invalid)}')
+      self._hex_pos = stop
+      return result
 
 
 class DerByteGetter(Iterator[int]):
@@ -47,6 +140,28 @@ class DerByteGetter(Iterator[int]):
          return cur[0]
       else:
          raise StopIteration()
+
+
+def to_buffer(buffer: bytes|bytearray|memoryview) -> memoryview:
+   """ memoryview of single bytes over buffer, as used by TLVParser.parse_buffer """
+   buffer = memoryview(buffer)
+   if buffer.format != 'B' or buffer.ndim != 1:
+      buffer = buffer.cast('B')
+   return buffer
+
+
+def map_file(path: str) -> memoryview:
+   """
+      Memory-maps the file read-only, to be parsed with TLVParser.parse_buffer
+      without reading it onto the heap. The mapping is released once the
+      returned view and every slice taken from it are dropped
+   """
+   with open(path, 'rb') as f:
+      if os.fstat(f.fileno()).st_size == 0:
+         # empty files can't be mapped
+         return memoryview(b'')
+      mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+   return memoryview(mapped)
    
 
 class DiagnosticsCollector:
@@ -78,11 +193,151 @@ class LengthExceededException(Exception):
 class ParseException(Exception):
    pass
 
+
+class ParseEventType(IntFlag):
+   START_CONSTRUCTED = 0
+   PRIMITIVE = 1
+   END_CONSTRUCTED = 2
+
+
+class ParseEvent:
+   """
+   offset is where the TLV starts in the input, end_offset is
+   where it ends, None for START_CONSTRUCTED since it is not known yet
+   """
+   __slots__ = ('type', 'tlv', 'depth', 'offset', 'end_offset')
+
+   def __init__(self, type: ParseEventType, tlv: TLV, depth: int, offset: int, end_offset: int|None = None) -> None:
+      self.type = type
+      self.tlv = tlv
+      self.depth = depth
+      self.offset = offset
+      self.end_offset = end_offset
+
+def tree_events(tlvs: list[TLV], offset: int = 0) -> Iterator[ParseEvent]:
+   """
+      Events of an already parsed tree, in the order iter_events gives them.
+      Offsets are summed from the sizes of the raw bytes, from offset, and
+      are exact for well-formed input
+   """
+   # iterators over the children of the open constructed TLVs
+   stack = [(iter(tlvs), None, offset)]
+   pos = offset
+   while stack:
+      children, parent, parent_offset = stack[-1]
+      tlv = next(children, None)
+      if tlv is None:
+         stack.pop()
+         if parent is not None:
+            if parent.length.indefinite:
+               # end-of-contents
+               pos += 2
+            yield ParseEvent(ParseEventType.END_CONSTRUCTED, parent, len(stack) - 1, parent_offset, pos)
+         continue
+
+      depth = len(stack) - 1
+      start = pos
+      pos += len(tlv.tag.raw) + len(tlv.length.raw)
+      if tlv.tag.type == TagType.PRIMITIVE:
+         if tlv.value is not None:
+            pos += len(tlv.value.get_raw())
+         yield ParseEvent(ParseEventType.PRIMITIVE, tlv, depth, start, pos)
+      elif tlv.value is None:
+         yield ParseEvent(ParseEventType.START_CONSTRUCTED, tlv, depth, start)
+         yield ParseEvent(ParseEventType.END_CONSTRUCTED, tlv, depth, start, pos)
+      else:
+         yield ParseEvent(ParseEventType.START_CONSTRUCTED, tlv, depth, start)
+         stack.append((iter(tlv.value.children), tlv, start))
+
+
+def is_end_of_contents(tlv: TLV) -> bool:
+   """ whether the TLV is the 00 00 ending an indefinite length value """
+   return tlv.tag.raw == b'\x00' and tlv.length.raw == b'\x00'
+
+
+# class, type and tag number of each first tag byte
+_TAG_HEADERS = [(TagClass((byte & 0b1100_0000) >> 6), TagType((byte & 0b0010_0000) >> 5), byte & 0b0001_1111) for byte in range(256)]
+# single byte tags, tag number 31 means more bytes follow
+_SINGLE_BYTE_TAGS = [Tag(cla, type, tag_number, bytes([byte])) for byte, (cla, type, tag_number) in enumerate(_TAG_HEADERS)]
+
+# raw bytes of single byte lengths, shared like the tags
+_SINGLE_BYTES = [bytes([byte]) for byte in range(256)]
+# primitive values parsed from a buffer up to this size are copied out of it,
+# a memoryview slice costs more memory and time than a short bytes copy
+SMALL_VALUE_SIZE = 128
+
+TAG_CACHE_SIZE = 4096
+# multiple byte tags by raw bytes, parsed tags are shared, Tag is immutable
+_tag_cache: dict[bytes, Tag] = {}
+
+def intern_tag(raw: bytes|bytearray|memoryview) -> Tag:
+   """ the shared Tag of the raw bytes of a complete tag, decoded on first use """
+   raw = bytes(raw)
+   if len(raw) == 1:
+      return _SINGLE_BYTE_TAGS[raw[0]]
+   tag = _tag_cache.get(raw)
+   if tag is None:
+      cla, type, tag_number = _TAG_HEADERS[raw[0]]
+      if tag_number == 31:
+         tag_number = 0
+         for byte in raw[1:]:
+            tag_number = (tag_number << 7) | (byte & 0b0111_1111)
+      if len(_tag_cache) >= TAG_CACHE_SIZE:
+         _tag_cache.clear()
+      tag = _tag_cache[raw] = Tag(cla, type, tag_number, raw)
+   return tag
+
+
+def read_tag_end(buffer: bytes|bytearray|memoryview, pos: int) -> int:
+   """ offset after the tag starting at pos in buffer, past the end of buffer if the tag isn't complete """
+   first = buffer[pos]
+   pos += 1
+   if first & 0b0001_1111 == 0b0001_1111:
+      # multiple byte tag, last byte has first bit 0
+      buffer_len = len(buffer)
+      while pos < buffer_len and buffer[pos] & 0b1000_0000:
+         pos += 1
+      pos += 1
+   return pos
+
+
+def read_length(buffer: bytes|bytearray|memoryview, pos: int) -> tuple[int|None, int]|None:
+   """ length at pos without building it, None if indefinite, and the offset after it. None if not complete in buffer """
+   buffer_len = len(buffer)
+   if pos >= buffer_len:
+      return None
+   cur_byte = buffer[pos]
+   pos += 1
+   if cur_byte & 0b1000_0000 == 0:
+      return cur_byte, pos
+   if cur_byte == 0b1000_0000:
+      return None, pos
+   length_of_length = cur_byte & 0b0111_1111
+   if pos + length_of_length > buffer_len:
+      return None
+   return int.from_bytes(buffer[pos:pos+length_of_length], 'big'), pos + length_of_length
+
+
+def read_header(buffer: bytes|bytearray|memoryview, pos: int) -> tuple[bool, int|None, int]|None:
+   """
+      Reads the tag and length at pos without building them, returns whether
+      the tag is constructed, the length (None if indefinite) and the offset
+      after the header. None if the header isn't complete in buffer
+   """
+   if pos >= len(buffer):
+      return None
+   length = read_length(buffer, read_tag_end(buffer, pos))
+   if length is None:
+      return None
+   return buffer[pos] & 0b0010_0000 != 0, length[0], length[1]
+
+
 class TLVParser:
    def __init__(
          self, 
          parent_tlv : TLV | None = None, 
-         diagnostic_collector: DiagnosticsCollector|None = None
+         diagnostic_collector: DiagnosticsCollector|None = None,
+         stats: 'ParseStats|None' = None
          ) -> None:
       self._parent_tlv = parent_tlv
       self._bytes_taken = 0
@@ -90,7 +345,9 @@ class TLVParser:
          self.diagnostic_collector = DiagnosticsCollector()
       else:
          self.diagnostic_collector = diagnostic_collector
-      
+      self.stats = stats
+      if stats is not None:
+         stats.instrument_parser(self)
 
    def _next(self, input :  Iterator[int])->int:
       # if bytes taken exceeds parent length, add error
@@ -109,48 +366,31 @@ class TLVParser:
          return None
       except EOFError:
          return None
-      
-      raw = bytearray()
-      raw.append(cur_byte)
-
-      # first bits 8-7 (LSB) is class
-      # Universal/Application/Context Specific/Private
-      cla = TagClass((cur_byte & 0b1100_0000) >> 6)
-      val = (cur_byte & 0b0010_0000) >> 5
 
-      # bit 6 is type
-      # Primitive/Constructed
-      type = TagType(int(val))
-      tag_number = cur_byte & 0b0001_1111
+      # first bits 8-7 (LSB) is class, bit 6 is type, the rest
+      # is the tag number, 31 if it continues on the next bytes
+      if cur_byte & 0b0001_1111 != 0b0001_1111:
+         return _SINGLE_BYTE_TAGS[cur_byte]
 
       # case tag on multiple bytes
-      tag_number_acc=''
-      if tag_number == 31:
-         while True:
-            # get next bytes
-            try:
-               cur_tag_num_byte = self._next(input)
-            except StopIteration:
-               self.diagnostic_collector.add_error(f'Unexpected EOF when parsing tag: {raw.hex()}')
-               return None
-
-            raw.append(cur_tag_num_byte)
-            cur_tag_num = cur_tag_num_byte & 0b0111_1111
-
-            if len(raw) == 2 and cur_tag_num == 0:
-               # first subsequent byte cannot be 0
-               self.diagnostic_collector.add_error("First subsequent tag byte cannot be 0x00")
-            
-            # append bits of cur tag num
-            tag_number_acc+= '{0:07b}'.format(cur_tag_num)
+      raw = [cur_byte]
+      while True:
+         # get next bytes
+         try:
+            cur_tag_num_byte = self._next(input)
+         except StopIteration:
+            self.diagnostic_collector.add_error(f'Unexpected EOF when parsing tag: {bytes(raw).hex()}')
+            return None
 
-            # if first bit 0, means last byte
-            if cur_tag_num_byte & 0b1000_0000 == 0:
-               break
-         # convert bit string to int, int is unbounded
-         tag_number =int(tag_number_acc, 2)
+         raw.append(cur_tag_num_byte)
+         if len(raw) == 2 and cur_tag_num_byte & 0b0111_1111 == 0:
+            # first subsequent byte cannot be 0
+            self.diagnostic_collector.add_error("First subsequent tag byte cannot be 0x00")
 
-      return Tag(cla,type, tag_number, raw)
+         # if first bit 0, means last byte
+         if cur_tag_num_byte & 0b1000_0000 == 0:
+            break
+      return intern_tag(bytes(raw))
 
 
 
@@ -165,11 +405,11 @@ class TLVParser:
          raw = bytearray()
          raw.append(cur_byte)
          return Length(cur_byte, raw)
-      elif cur_byte & 0b1000_0000 == 0 and cur_byte & 0b0111_1111:
-         # case using indefinite form, i.e. length byte is 0x80
-         # not supported yet
-         self.diagnostic_collector.add_error(f'Indefinite length encoding is not supported: {raw.hex()}')
-         return None
+      elif cur_byte == 0b1000_0000:
+         # case using indefinite form, value ends with end-of-contents 00 00
+         raw = bytearray()
+         raw.append(cur_byte)
+         return Length(None, raw, indefinite=True)
       else:
          length_of_length = cur_byte & 0b0111_1111
          real_length = 0
@@ -206,52 +446,332 @@ class TLVParser:
       return PrimitiveValue(val)
    
 
-   """ recursively parse children TLV """
-   def _parse_constructed(self, input :  Iterator[int],  in_tlv: TLV) -> ConstructedValue | None:
-
-      new_parser = TLVParser(in_tlv)
-      children = new_parser.parse_tlv(input)
+   def _check_indefinite(self, tlv: TLV) -> bool:
+      if tlv.length.indefinite and tlv.tag.type == TagType.PRIMITIVE:
+         self.diagnostic_collector.add_error(f'Indefinite length is not allowed for primitive TLV: {tlv.tag.raw.hex()}')
+         return False
+      return True
 
-      self.diagnostic_collector.extend_diagnostics(new_parser.diagnostic_collector.get_diagnostics())
-      self._bytes_taken += new_parser._bytes_taken
+   def _is_parent_end_of_contents(self, tlv: TLV) -> bool:
+      return self._parent_tlv is not None and self._parent_tlv.length.indefinite and is_end_of_contents(tlv)
 
-      return ConstructedValue(children)
+   def _end_indefinite(self, tlv: TLV, bytes_taken: int, end_of_contents_found: bool):
+      """ sets the length of the indefinite length TLV, once its children are parsed """
+      if end_of_contents_found:
+         tlv.length.length = bytes_taken - 2
+      else:
+         self.diagnostic_collector.add_error(f'Unexpected EOF, end-of-contents not found for indefinite length TLV: {tlv.tag.raw.hex()}')
+         tlv.length.length = bytes_taken
 
 
-   def _parse_value(self, input :  Iterator[int],  in_tlv: TLV) -> Value | None:
+   def _parse_value(self, input :  Iterator[int],  in_tlv: TLV) -> PrimitiveValue | None:
+      """ value of a primitive TLV, children of constructed TLVs are parsed by iter_events """
       if in_tlv.length.length == 0:
          return None
-      
-      if in_tlv.tag.type == TagType.PRIMITIVE:
-         return self._parse_primitive(input, in_tlv)
-      else:
-         return self._parse_constructed(input, in_tlv)
+      return self._parse_primitive(input, in_tlv)
 
 
    def parse_tlv(self, input : Iterator[int]) -> list[TLV]:
+      """
+         Builds the tree from iter_events, nesting is kept on an explicit
+         stack so deep inputs don't hit the recursion limit
+      """
       result = []
+      # children lists of the open constructed TLVs
+      stack = []
+      children = result
+      for event in self.iter_events(input):
+         if event.type == ParseEventType.PRIMITIVE:
+            children.append(event.tlv)
+         elif event.tlv.value is None:
+            # constructed TLV without value, start and end come together
+            if event.type == ParseEventType.START_CONSTRUCTED:
+               children.append(event.tlv)
+         elif event.type == ParseEventType.START_CONSTRUCTED:
+            children.append(event.tlv)
+            stack.append(children)
+            children = event.tlv.value.children
+         else:
+            children = stack.pop()
+      return result
+
+
+   def iter_events(self, input : Iterator[int]) -> Iterator[ParseEvent]:
+      """
+         Parses like parse_tlv, but yields events as soon as each TLV is parsed
+         instead of building the tree. Constructed TLVs are only held until their
+         END_CONSTRUCTED event and their values have no children, so memory does
+         not grow with the size of the input
+      """
+      # open constructed TLVs, each with the state of its parent level
+      # which is restored once it ends
+      stack = []
+      # offset of the start of the current level in the input
+      base = 0
       while True:
-         try:
-            if self._parent_tlv and self._parent_tlv.length.length == self._bytes_taken:
-               # already parsed expected length
-               break
+         tlv = None
+         end_of_contents_found = False
+         if not (self._parent_tlv and self._parent_tlv.length.length == self._bytes_taken):
+            offset = base + self._bytes_taken
             tag = self._parse_tag(input)
-            if tag == None:
-               break
-            len = self._parse_length(input)
-            if len == None:
-               break
-
-            tlv= TLV(tag, len, None)
-
-            value = self._parse_value(input, tlv)
-
-            tlv.value = value
-            result.append(tlv)
-         except LengthExceededException as e:
-            print(e.in_tlv)
-            print(e.input)
-            raise e
-         except Exception as e:
-            raise e
+            length = self._parse_length(input) if tag is not None else None
+            if length is not None:
+               tlv = TLV(tag, length, None)
+               if self._is_parent_end_of_contents(tlv):
+                  end_of_contents_found = True
+                  tlv = None
+               elif not self._check_indefinite(tlv):
+                  tlv = None
+
+         if tlv is None:
+            # current level ended, continue with its parent
+            if not stack:
+               return
+            bytes_taken = self._bytes_taken
+            if self._parent_tlv.length.indefinite:
+               self._end_indefinite(self._parent_tlv, bytes_taken, end_of_contents_found)
+            self._parent_tlv, self._bytes_taken, base, parent, parent_offset = stack.pop()
+            self._bytes_taken += bytes_taken
+            yield ParseEvent(ParseEventType.END_CONSTRUCTED, parent, len(stack), parent_offset, base + self._bytes_taken)
+            continue
+
+         if tlv.tag.type == TagType.PRIMITIVE:
+            tlv.value = self._parse_value(input, tlv)
+            yield ParseEvent(ParseEventType.PRIMITIVE, tlv, len(stack), offset, base + self._bytes_taken)
+         elif tlv.length.length == 0:
+            yield ParseEvent(ParseEventType.START_CONSTRUCTED, tlv, len(stack), offset)
+            yield ParseEvent(ParseEventType.END_CONSTRUCTED, tlv, len(stack), offset, base + self._bytes_taken)
+         else:
+            tlv.value = ConstructedValue()
+            yield ParseEvent(ParseEventType.START_CONSTRUCTED, tlv, len(stack), offset)
+            stack.append((self._parent_tlv, self._bytes_taken, base, tlv, offset))
+            base += self._bytes_taken
+            self._parent_tlv = tlv
+            self._bytes_taken = 0
+
+
+   def _check_parent_buffer(self, start: int, stop: int, end: int|None, parent_length: int):
+      # mirrors the check in _next, fires if one of the attempted reads in
+      # [start, stop) is at the parent end offset
+      if end is not None and start <= end < stop:
+         self.diagnostic_collector.add_diagnostics(f'TLV length exceeds parent length of: {parent_length}')
+
+   def _read_buffer(self, buffer: memoryview, pos: int, count: int, end: int|None, parent_length: int) -> tuple[memoryview|None, int]:
+      """
+         Reads count bytes at pos, returns the slice and the new cursor.
+         Like _next, a failed read still advances the cursor by one,
+         so the parent length checks behave the same as the iterator path
+      """
+      buffer_len = len(buffer)
+      if pos + count <= buffer_len:
+         self._check_parent_buffer(pos, pos + count, end, parent_length)
+         return buffer[pos:pos+count], pos + count
+      new_pos = max(pos, buffer_len) + 1
+      self._check_parent_buffer(pos, new_pos, end, parent_length)
+      return None, new_pos
+
+   def _parse_tag_buffer(self, buffer: memoryview, pos: int, end: int|None, parent_length: int) -> tuple[Tag|None, int]:
+      # single byte tag inside the buffer and the parent, checked inline as
+      # it's most headers, the other cases go through _read_buffer
+      if pos < len(buffer) and pos != end:
+         cur_byte = buffer[pos]
+         if cur_byte & 0b0001_1111 != 0b0001_1111:
+            return _SINGLE_BYTE_TAGS[cur_byte], pos + 1
+
+      start = pos
+      first, pos = self._read_buffer(buffer, pos, 1, end, parent_length)
+      if first is None:
+         return None, pos
+      cur_byte = first[0]
+      if cur_byte & 0b0001_1111 != 0b0001_1111:
+         return _SINGLE_BYTE_TAGS[cur_byte], pos
+
+      # case tag on multiple bytes, last byte has first bit 0
+      buffer_len = len(buffer)
+      stop = pos
+      while stop < buffer_len and buffer[stop] & 0b1000_0000:
+         stop += 1
+      # the parent length checks are split around the second byte so the
+      # diagnostics come in the same order as when reading byte by byte
+      self._check_parent_buffer(pos, pos + 1, end, parent_length)
+      if pos < buffer_len and buffer[pos] & 0b0111_1111 == 0:
+         # first subsequent byte cannot be 0
+         self.diagnostic_collector.add_error("First subsequent tag byte cannot be 0x00")
+      if stop >= buffer_len:
+         # like _read_buffer, the failed read still advances the cursor
+         self._check_parent_buffer(pos + 1, buffer_len + 1, end, parent_length)
+         self.diagnostic_collector.add_error(f'Unexpected EOF when parsing tag: {buffer[start:buffer_len].hex()}')
+         return None, buffer_len + 1
+      stop += 1
+      self._check_parent_buffer(pos + 1, stop, end, parent_length)
+      return intern_tag(buffer[start:stop]), stop
+
+   def _parse_length_buffer(self, buffer: memoryview, pos: int, end: int|None, parent_length: int) -> tuple[Length|None, int]:
+      # length fully inside the buffer and the parent, checked inline like the tag
+      buffer_len = len(buffer)
+      if pos < buffer_len and pos != end:
+         cur_byte = buffer[pos]
+         if cur_byte & 0b1000_0000 == 0:
+            return Length(cur_byte, _SINGLE_BYTES[cur_byte]), pos + 1
+         if cur_byte != 0b1000_0000:
+            stop = pos + 1 + (cur_byte & 0b0111_1111)
+            if stop <= buffer_len and (end is None or not pos < end < stop):
+               raw = bytes(buffer[pos:stop])
+               return Length(int.from_bytes(raw[1:], 'big'), raw), stop
+
+      start = pos
+      first, pos = self._read_buffer(buffer, pos, 1, end, parent_length)
+      if first is None:
+         self.diagnostic_collector.add_error("Unexpected EOF while parsing length")
+         return None, pos
+      cur_byte = first[0]
+
+      if cur_byte & 0b1000_0000 == 0:
+         return Length(cur_byte, _SINGLE_BYTES[cur_byte]), pos
+      if cur_byte == 0b1000_0000:
+         # indefinite form, value ends with end-of-contents 00 00
+         return Length(None, _SINGLE_BYTES[cur_byte], indefinite=True), pos
+
+      # multiple byte length
+      length_of_length = cur_byte & 0b0111_1111
+      length_bytes, new_pos = self._read_buffer(buffer, pos, length_of_length, end, parent_length)
+      if length_bytes is None:
+         self.diagnostic_collector.add_error(f'Unexpected EOF while parsing length: {buffer[start:new_pos-1].hex()}')
+         return None, new_pos
+      return Length(length=int.from_bytes(length_bytes, 'big'), raw=bytes(buffer[start:new_pos])), new_pos
+
+   def _find_end_of_contents(self, buffer: memoryview, pos: int) -> int|None:
+      """
+         Offset of the end-of-contents of the indefinite length value starting at pos.
+         Only reads headers and skips definite length values, no objects are built.
+         None if not found before EOF
+      """
+      buffer_len = len(buffer)
+      depth = 0
+      while pos < buffer_len:
+         start = pos
+         header = read_header(buffer, pos)
+         if header is None:
+            return None
+         constructed, length, pos = header
+         if length is None:
+            if not constructed:
+               # primitive can't be indefinite, left for the parse to report
+               return None
+            depth += 1
+         elif length == 0 and pos - start == 2 and buffer[start] == 0:
+            if depth == 0:
+               return start
+            depth -= 1
+         else:
+            pos += length
+      return None
+
+   def _parse_value_buffer(self, buffer: memoryview, pos: int, end: int|None, parent_length: int, in_tlv: TLV) -> tuple[Value|None, int]:
+      """ primitive values, or lazy constructed values whose children are parsed on access """
+      expected_len = in_tlv.length.length
+      if expected_len == 0:
+         return None, pos
+
+      if in_tlv.tag.type == TagType.PRIMITIVE:
+         stop = pos + expected_len
+         if stop <= len(buffer) and (end is None or not pos <= end < stop):
+            val, pos = buffer[pos:stop], stop
+         else:
+            val, pos = self._read_buffer(buffer, pos, expected_len, end, parent_length)
+            if val is None:
+               self.diagnostic_collector.add_error("Unexpected EOF while parsing value")
+               return None, pos
+         if expected_len <= SMALL_VALUE_SIZE:
+            val = bytes(val)
+         return PrimitiveValue(val), pos
+
+      # only record the children bytes, the constructed length is trusted
+      # to find the next TLV
+      if in_tlv.length.indefinite:
+         end_of_contents = self._find_end_of_contents(buffer, pos)
+         if end_of_contents is None:
+            self.diagnostic_collector.add_error(f'Unexpected EOF, end-of-contents not found for indefinite length TLV: {in_tlv.tag.raw.hex()}')
+            content_end = next_pos = len(buffer)
+         else:
+            content_end, next_pos = end_of_contents, end_of_contents + 2
+         expected_len = in_tlv.length.length = content_end - pos
+      else:
+         content_end = next_pos = pos + expected_len
+      self._check_parent_buffer(pos, next_pos, end, parent_length)
+      source = buffer[pos:content_end]
+      if len(source) < expected_len:
+         self.diagnostic_collector.add_error("Unexpected EOF while parsing value")
+      return ConstructedValue.deferred(source, lambda source: self._parse_deferred(source, expected_len)), next_pos
+
+   def _parse_deferred(self, source: memoryview, expected_len: int) -> list[TLV]:
+      children, _ = self._parse_buffer_tlvs(source, 0, expected_len, expected_len, True)
+      return children
+
+   def _parse_buffer_tlvs(self, buffer: memoryview, pos: int, end: int|None, parent_length: int, lazy: bool) -> tuple[list[TLV], int]:
+      """
+         Parses TLVs at pos until end, or until a TLV can't be parsed if end is None.
+         Nesting is kept on an explicit stack instead of recursing per constructed TLV
+      """
+      buffer_len = len(buffer)
+      result = []
+      # open constructed TLVs, each with the state of its parent level
+      # which is restored once it ends
+      stack = []
+      children, level_tlv, start = result, None, pos
+      while True:
+         tlv = None
+         end_of_contents_found = False
+         # a read at EOF fails without diagnostics, so the outer level can stop
+         # there and leave the cursor at the end of the buffer
+         if pos != end and (stack or pos < buffer_len):
+            tag, pos = self._parse_tag_buffer(buffer, pos, end, parent_length)
+            if tag is not None:
+               length, pos = self._parse_length_buffer(buffer, pos, end, parent_length)
+               if length is not None:
+                  tlv = TLV(tag, length, None)
+            if tlv is not None:
+               if level_tlv is not None and level_tlv.length.indefinite and is_end_of_contents(tlv):
+                  end_of_contents_found = True
+                  tlv = None
+               elif not self._check_indefinite(tlv):
+                  tlv = None
+
+         if tlv is None:
+            # current level ended, continue with its parent
+            if not stack:
+               return result, pos
+            if level_tlv.length.indefinite:
+               self._end_indefinite(level_tlv, pos - start, end_of_contents_found)
+            children, level_tlv, start, end, parent_length = stack.pop()
+            continue
+
+         children.append(tlv)
+         if lazy or tlv.tag.type == TagType.PRIMITIVE or tlv.length.length == 0:
+            tlv.value, pos = self._parse_value_buffer(buffer, pos, end, parent_length, tlv)
+            continue
+
+         tlv.value = ConstructedValue()
+         stack.append((children, level_tlv, start, end, parent_length))
+         children, level_tlv, start = tlv.value.children, tlv, pos
+         if tlv.length.indefinite:
+            # children of indefinite length values end at the end-of-contents
+            end, parent_length = None, 0
+         else:
+            end, parent_length = pos + tlv.length.length, tlv.length.length
+
+   def parse_buffer(self, buffer: bytes|bytearray|memoryview, lazy: bool = False) -> list[TLV]:
+      """
+         Parses TLVs from a whole buffer with an offset cursor instead of
+         pulling one byte at a time. Raw bytes of Tag and Length are copied,
+         so are primitive values up to SMALL_VALUE_SIZE, longer values are
+         memoryview slices over the buffer, which must then outlive the result.
+         Gives the same TLV tree and diagnostics as parse_tlv.
+
+         If lazy, children of constructed values are only parsed the first time
+         they are accessed, diagnostics of those are added at that point.
+         Lengths of constructed values are then trusted, children exceeding
+         it are cut off instead of being parsed past the parent
+      """
+      result, _ = self._parse_buffer_tlvs(to_buffer(buffer), 0, None, 0, lazy)
       return result
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import unittest
+from tlvisuals.async_parser import AsyncTLVParser
+from tlvisuals.tlv_parser import TLVParser
+from tlvisuals.output_builder.raw_format import RawFormatBuilder
+
+class TestAsyncTLVParser(unittest.TestCase):
+
+   def setUp(self) -> None:
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         record = bytes.fromhex(f.read())
+      self.input = record + b'\x81\x01\xFF' + b'\x30\x80\x04\x01\xAA\x00\x00' + record
+
+   async def parse_chunks(self, chunks: list[bytes], parser_output: list):
+      reader = asyncio.StreamReader()
+      parser = AsyncTLVParser(reader, chunk_size=7)
+      async def feed():
+         for chunk in chunks:
+            reader.feed_data(chunk)
+            # lets the parser run between chunks
+            await asyncio.sleep(0)
+         reader.feed_eof()
+      async def consume():
+         async for tlv in parser:
+            # emitted before the rest of the stream arrives
+            parser_output.append((tlv, reader.at_eof()))
+      await asyncio.gather(feed(), consume())
+      return parser
+
+   def chunked(self, input: bytes, size: int) -> list[bytes]:
+      return [input[i:i+size] for i in range(0, len(input), size)]
+
+   def test_same_as_parse_buffer(self):
+      expected = RawFormatBuilder().build(TLVParser().parse_buffer(self.input))
+      for size in [1, 5, 64, len(self.input)]:
+         with self.subTest(size=size):
+            output = []
+            parser = asyncio.run(self.parse_chunks(self.chunked(self.input, size), output))
+            self.assertEqual(RawFormatBuilder().build([tlv for tlv, _ in output]), expected)
+            self.assertEqual(parser.diagnostic_collector.get_diagnostics(), [])
+            self.assertEqual(len(output), 4)
+
+   def test_emitted_as_soon_as_complete(self):
+      output = []
+      asyncio.run(self.parse_chunks(self.chunked(self.input, 1), output))
+      self.assertFalse(output[0][1])
+
+   def test_concurrent_connections(self):
+      async def run():
+         outputs = [[], []]
+         await asyncio.gather(
+            self.parse_chunks(self.chunked(self.input, 3), outputs[0]),
+            self.parse_chunks(self.chunked(b'\x81\x01\xFF' * 10, 2), outputs[1]))
+         return outputs
+      outputs = asyncio.run(run())
+      self.assertEqual(len(outputs[0]), 4)
+      self.assertEqual(len(outputs[1]), 10)
+
+   def test_truncated(self):
+      output = []
+      parser = asyncio.run(self.parse_chunks([b'\x81\x01\xFF\x30\x05\x04\x01'], output))
+      self.assertEqual(len(output), 2)
+      self.assertEqual(len(parser.diagnostic_collector.get_diagnostics()), 1)
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,70 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from tlvisuals.__main__ import tlvbatch
+from tlvisuals.batch import collect_input_files, get_output_paths, run_batch
+
+class TestBatch(unittest.TestCase):
+
+   def setUp(self) -> None:
+      self.dir = tempfile.TemporaryDirectory()
+      self.inputs = os.path.join(self.dir.name, 'inputs')
+      os.makedirs(self.inputs)
+      for name, content in [('a.txt', '81 01 FF'), ('b.txt', 'A1 03 82 01 EE'), ('c.txt', '30 05 81')]:
+         with open(os.path.join(self.inputs, name), 'w') as f:
+            f.write(content)
+
+   def tearDown(self) -> None:
+      self.dir.cleanup()
+
+   def test_collect_input_files(self):
+      expected = [os.path.join(self.inputs, name) for name in ['a.txt', 'b.txt', 'c.txt']]
+      self.assertEqual(collect_input_files([self.inputs]), expected)
+      self.assertEqual(collect_input_files([os.path.join(self.inputs, '[ab].txt')]), expected[:2])
+
+   def test_combined_output(self):
+      paths = collect_input_files([self.inputs])
+      output = io.StringIO()
+      diagnostics = io.StringIO()
+      result = run_batch(paths, output, diagnostics, jobs=2)
+      self.assertEqual(result, 1)
+      self.assertEqual(output.getvalue(),
+         f'==> {paths[0]} <==\n81 01 FF\n'
+         f'==> {paths[1]} <==\nA1 03\n   82 01 EE\n'
+         f'==> {paths[2]} <==\n30 05\n')
+      self.assertEqual(diagnostics.getvalue(), f'{paths[2]}: error: Unexpected EOF while parsing length\n')
+
+   def test_out_dir(self):
+      paths = collect_input_files([self.inputs])
+      out_dir = os.path.join(self.dir.name, 'out')
+      run_batch(paths, None, io.StringIO(), out_dir=out_dir, jobs=2)
+      self.assertEqual(sorted(os.listdir(out_dir)), ['a.txt.txt', 'b.txt.txt', 'c.txt.txt'])
+      with open(os.path.join(out_dir, 'b.txt.txt')) as f:
+         self.assertEqual(f.read(), 'A1 03\n   82 01 EE\n')
+
+   def test_out_dir_same_names(self):
+      for name, value in [('x', '0A'), ('y', '0B')]:
+         os.makedirs(os.path.join(self.inputs, name))
+         with open(os.path.join(self.inputs, name, 'a.txt'), 'w') as f:
+            f.write('81 01 ' + value)
+      paths = collect_input_files([os.path.join(self.inputs, '**', 'a.txt')])
+      self.assertEqual(len(paths), 3)
+      out_dir = os.path.join(self.dir.name, 'out')
+      self.assertEqual(get_output_paths(paths, out_dir), [os.path.join(out_dir, name) for name in ['a.txt.txt', 'x/a.txt.txt', 'y/a.txt.txt']])
+      run_batch(paths, None, io.StringIO(), out_dir=out_dir, jobs=2)
+      for name, expected in [('a.txt.txt', '81 01 FF\n'), ('x/a.txt.txt', '81 01 0A\n'), ('y/a.txt.txt', '81 01 0B\n')]:
+         with open(os.path.join(out_dir, name)) as f:
+            self.assertEqual(f.read(), expected)
+
+   def test_exit_status(self):
+      args = argparse.Namespace(out=None, out_dir=os.path.join(self.dir.name, 'out'), jobs=1, input_format=None, output_format=None)
+      with contextlib.redirect_stderr(io.StringIO()):
+         self.assertEqual(tlvbatch(argparse.Namespace(inputs=[self.inputs], **vars(args))), 1)
+         self.assertEqual(tlvbatch(argparse.Namespace(inputs=[os.path.join(self.inputs, '[ab].txt')], **vars(args))), 0)
+
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+from benchmarks.corpus import SHAPES, generate
+from tlvisuals.tlv_parser import TLVParser
+from tlvisuals.tlv import ConstructedValue
+
+class TestBenchmarkCorpus(unittest.TestCase):
+
+   def count(self, tlvs):
+      count = 0
+      stack = list(tlvs)
+      while stack:
+         tlv = stack.pop()
+         count += 1
+         if isinstance(tlv.value, ConstructedValue):
+            stack.extend(tlv.value.children)
+      return count
+
+   def test_shapes_parse_cleanly(self):
+      for shape in SHAPES:
+         with self.subTest(shape=shape):
+            corpus, tlv_count = generate(shape, 20000)
+            self.assertGreaterEqual(len(corpus), 20000)
+            parser = TLVParser()
+            parsed = parser.parse_buffer(corpus)
+            self.assertEqual(parser.diagnostic_collector.get_diagnostics(), [])
+            self.assertEqual(self.count(parsed), tlv_count)
+
+   def test_deterministic(self):
+      self.assertEqual(generate('wide', 5000, seed=3), generate('wide', 5000, seed=3))
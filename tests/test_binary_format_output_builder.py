@@ -0,0 +1,59 @@
+import io
+import os
+import unittest
+from io import BytesIO
+from tlvisuals.output_builder.binary_format import ColumnarBuilder, ColumnarFormatException, read_groups, MAX_LENGTH
+from tlvisuals.tlv_parser import TLVParser, ByteGetter
+
+class ColumnarBuilderTest(unittest.TestCase):
+
+   def read(self, data: bytes) -> list[tuple]:
+      rows = []
+      for tags, columns, blob in read_groups(BytesIO(data)):
+         for i in range(len(columns['depth'])):
+            value_offset = columns['value_offset'][i]
+            value = None if value_offset == -1 else blob[value_offset:value_offset+columns['value_len'][i]]
+            rows.append((columns['depth'][i], columns['offset'][i], tags[columns['tag_id'][i]], columns['length'][i], value))
+      return rows
+
+   def test_rows(self):
+      input = b'\x81\x01\xFF\xA1\x08\x9f\x02\x00\x82\x01\xEE\x30\x80\x00\x00'
+      rows = self.read(ColumnarBuilder().build(TLVParser().parse_buffer(input)))
+      self.assertEqual(rows, [
+         (0, 0, b'\x81', 1, b'\xFF'),
+         (0, 3, b'\xA1', 8, None),
+         (1, 5, b'\x9f\x02', 0, None),
+         (1, 8, b'\x82', 1, b'\xEE'),
+         (1, 11, b'\x30', -1, None),
+      ])
+
+   def test_oversized_length(self):
+      # long form length above the int64 column
+      input = '0489FFFFFFFFFFFFFFFFFF'
+      output = BytesIO()
+      ColumnarBuilder().build_events_on_output(TLVParser().iter_events(ByteGetter(io.StringIO(input))), output)
+      self.assertEqual([row[3] for row in self.read(output.getvalue())], [MAX_LENGTH])
+      self.assertEqual([row[3] for row in self.read(ColumnarBuilder().build(TLVParser().parse_buffer(bytes.fromhex(input))))], [MAX_LENGTH])
+
+   def test_groups(self):
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         input = bytes.fromhex(f.read())
+      tlvs = TLVParser().parse_buffer(input)
+      expected = self.read(ColumnarBuilder().build(tlvs))
+      data = ColumnarBuilder(group_rows=7).build(tlvs)
+      self.assertGreater(len(list(read_groups(BytesIO(data)))), 1)
+      self.assertEqual(self.read(data), expected)
+
+      output = BytesIO()
+      ColumnarBuilder(group_rows=7).build_events_on_output(TLVParser().iter_events(input.__iter__()), output)
+      self.assertEqual(output.getvalue(), data)
+
+   def test_invalid(self):
+      with self.assertRaises(ColumnarFormatException):
+         list(read_groups(BytesIO(b'TLVXXX')))
+      data = ColumnarBuilder().build(TLVParser().parse_buffer(b'\x81\x01\xFF'))
+      with self.assertRaises(ColumnarFormatException):
+         list(read_groups(BytesIO(data[:-3])))
+
+if __name__ == '__main__':
+   unittest.main()
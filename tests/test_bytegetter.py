@@ -65,6 +65,39 @@ class TestByteGetter(unittest.TestCase):
 
          count +=1
 
+   def test_whitespace_across_chunks(self):
+      stream = io.StringIO(" 0 0\n11\t2 2 33\r\n44 5")
+      byte_getter = ByteGetter(stream, chunk_size=3)
+      self.assertEqual(byte_getter.__next__(), 0x00)
+      self.assertEqual(byte_getter.__next__(), 0x11)
+      with self.assertRaisesRegex(ValueError, "Odd number of chars found at offset 19"):
+         list(byte_getter)
+
+   def test_invalid_chars_offset(self):
+      for chunk_size in [1, 2, 5, ByteGetter.CHUNK_SIZE]:
+         with self.subTest(chunk_size=chunk_size):
+            stream = io.StringIO("AA BB CX DD")
+            byte_getter = ByteGetter(stream, chunk_size=chunk_size)
+            result = []
+            with self.assertRaisesRegex(ValueError, "Invalid hex found CX at offset 7"):
+               for cur in byte_getter:
+                  result.append(cur)
+            self.assertEqual(result, [0xAA, 0xBB])
+            # continues after the invalid pair
+            self.assertEqual(list(byte_getter), [0xDD])
+
+   def test_bytes(self):
+      stream = io.StringIO("0011 2233\n" * 1000)
+      byte_getter = ByteGetter(stream, chunk_size=7)
+      self.assertEqual(bytes(byte_getter), b'\x00\x11\x22\x33' * 1000)
+
+   def test_read_block_after_next(self):
+      stream = io.StringIO("00112233")
+      byte_getter = ByteGetter(stream)
+      self.assertEqual(byte_getter.__next__(), 0x00)
+      self.assertEqual(byte_getter.read_block(), b'\x11\x22\x33')
+      self.assertEqual(byte_getter.read_block(), b'')
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,36 @@
+import gc
+import os
+import unittest
+from tlvisuals.flat_tree import FIELDS, flatten_tlvs, unflatten_tlvs
+from tlvisuals.tlv_parser import TLVParser, to_buffer
+from tests.test_parser import SameAsIteratorTests
+
+class TestFlatTree(unittest.TestCase):
+
+   def setUp(self) -> None:
+      self.dump = SameAsIteratorTests().dump
+
+   def assertRoundTrip(self, input: bytes):
+      tlvs = TLVParser().parse_buffer(input)
+      flat = flatten_tlvs(tlvs)
+      self.assertEqual(len(flat) % FIELDS, 0)
+      self.assertEqual(self.dump(unflatten_tlvs(to_buffer(input), 0, flat)), self.dump(tlvs))
+
+   def test_round_trip(self):
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         self.assertRoundTrip(bytes.fromhex(f.read()))
+
+   def test_indefinite(self):
+      self.assertRoundTrip(bytes.fromhex('3080' '3080' '020101' '0000' '3000' '040102' '0000' '0500'))
+
+   def test_gc_restored(self):
+      input = bytes.fromhex('3003' '040101')
+      flat = flatten_tlvs(TLVParser().parse_buffer(input))
+      unflatten_tlvs(to_buffer(input), 0, flat)
+      self.assertTrue(gc.isenabled())
+      gc.disable()
+      try:
+         unflatten_tlvs(to_buffer(input), 0, flat)
+         self.assertFalse(gc.isenabled())
+      finally:
+         gc.enable()
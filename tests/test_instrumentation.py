@@ -0,0 +1,62 @@
+import json
+import unittest
+from tlvisuals.instrumentation import ParseStats
+from tlvisuals.tlv_parser import TLVParser
+from tlvisuals.output_builder.raw_format import RawFormatBuilder
+
+class TestParseStats(unittest.TestCase):
+
+   def setUp(self) -> None:
+      # 81 01 FF, A1 05 { A2 03 { 81 01 EE } }, 1F 80 01 00
+      self.input = b'\x81\x01\xFF\xA1\x05\xA2\x03\x81\x01\xEE\x1f\x80\x01\x00'
+
+   def test_parse_tlv(self):
+      stats = ParseStats()
+      parser = TLVParser(stats=stats)
+      parser.parse_tlv(self.input.__iter__())
+      self.assertEqual(stats.bytes_consumed, len(self.input))
+      self.assertEqual(stats.tlvs_per_depth, {0: 3, 1: 1, 2: 1})
+      self.assertEqual(stats.calls['length'], 5)
+      self.assertEqual(stats.calls['value'], 3)
+      self.assertEqual(stats.diagnostics, 1)
+
+   def test_parse_buffer(self):
+      stats = ParseStats()
+      TLVParser(stats=stats).parse_buffer(self.input)
+      self.assertEqual(stats.bytes_consumed, len(self.input))
+      self.assertEqual(stats.tlvs_per_depth, {0: 3, 1: 1, 2: 1})
+      self.assertEqual(stats.calls['length'], 5)
+      self.assertEqual(stats.calls['parse'], 1)
+      self.assertEqual(stats.diagnostics, 1)
+
+   def test_same_result(self):
+      expected = RawFormatBuilder().build(TLVParser().parse_buffer(self.input))
+      stats = ParseStats()
+      result = RawFormatBuilder(stats=stats).build(TLVParser(stats=stats).parse_buffer(self.input))
+      self.assertEqual(result, expected)
+      self.assertEqual(stats.calls['build'], 5)
+
+   def test_disabled(self):
+      parser = TLVParser()
+      self.assertNotIn('_parse_tag', vars(parser))
+      self.assertNotIn('_format_line', vars(RawFormatBuilder()))
+
+   def test_formats(self):
+      stats = ParseStats()
+      TLVParser(stats=stats).parse_tlv(self.input.__iter__())
+      self.assertEqual(json.loads(stats.format_json())['tlvs'], 5)
+      self.assertIn('   depth 2: 1\n', stats.format_text())
+
+   def test_add_parse(self):
+      # parser methods are wrapped but never called, e.g. when the tree is parsed in other processes
+      stats = ParseStats()
+      TLVParser(stats=stats)
+      stats.add_parse(TLVParser().parse_buffer(self.input), len(self.input), 0.5)
+      self.assertEqual(stats.bytes_consumed, len(self.input))
+      self.assertEqual(stats.get_tlv_count(), 5)
+      self.assertEqual(stats.get_timings(), {'parse': 0.5})
+      self.assertEqual(list(json.loads(stats.format_json())['timings']), ['parse'])
+      self.assertNotIn('tag:', stats.format_text())
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,53 @@
+import json
+import os
+import unittest
+from io import StringIO
+from tlvisuals.output_builder.json_format import JsonLinesBuilder
+from tlvisuals.tlv_parser import TLVParser
+from tlvisuals.tag_dictionary import create_dictionary
+
+class JsonLinesBuilderTest(unittest.TestCase):
+
+   def setUp(self) -> None:
+      self.builder = JsonLinesBuilder()
+
+   def test_records(self):
+      input = b'\x81\x01\xFF\xA1\x09\x82\x00\x82\x01\xEE\x30\x80\x00\x00\x81\x00'
+      records = [json.loads(line) for line in self.builder.build(TLVParser().parse_buffer(input)).splitlines()]
+      self.assertEqual([(record['path'], record['depth'], record['offset']) for record in records], [
+         ('81[0]', 0, 0),
+         ('A1[0]', 0, 3),
+         ('A1[0]/82[0]', 1, 5),
+         ('A1[0]/82[1]', 1, 7),
+         ('A1[0]/30[0]', 1, 10),
+         ('81[1]', 0, 14),
+      ])
+      self.assertEqual(records[0], {
+         'path': '81[0]', 'depth': 0, 'offset': 0, 'tag': '81', 'class': 'CONTEXT_SPECIFIC',
+         'type': 'PRIMITIVE', 'tag_number': 1, 'length': 1, 'value': 'FF'})
+      self.assertIsNone(records[1]['value'])
+      self.assertIsNone(records[2]['value'])
+      self.assertEqual(records[3]['value'], 'EE')
+      self.assertIsNone(records[4]['length'])
+
+   def test_dictionary(self):
+      # SEQUENCE { INTEGER 300, OCTET STRING }
+      input = bytes.fromhex('3006' '0202012C' '0400')
+      builder = JsonLinesBuilder(tag_dictionary=create_dictionary('x690'))
+      records = [json.loads(line) for line in builder.build(TLVParser().parse_buffer(input)).splitlines()]
+      self.assertEqual([(record['name'], record['decoded']) for record in records],
+                       [('SEQUENCE', None), ('INTEGER', '300'), ('OCTET STRING', None)])
+      self.assertNotIn('name', json.loads(self.builder.build(TLVParser().parse_buffer(input)).splitlines()[0]))
+
+   def test_events_same_as_tree(self):
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         input = bytes.fromhex(f.read())
+      input += b'\x30\x80\x04\x01\xAA\x31\x80\x00\x00\x00\x00' + input
+      expected = self.builder.build(TLVParser().parse_buffer(input))
+
+      output = StringIO()
+      JsonLinesBuilder(flush_size=100).build_events_on_output(TLVParser().iter_events(input.__iter__()), output)
+      self.assertEqual(output.getvalue(), expected)
+
+if __name__ == '__main__':
+   unittest.main()
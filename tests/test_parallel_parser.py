@@ -0,0 +1,66 @@
+import os
+import pickle
+import tempfile
+import unittest
+from tlvisuals.parallel_parser import ParallelTLVParser, scan_top_level, split_ranges
+from tlvisuals.tlv_parser import TLVParser, to_buffer
+from tests.test_parser import SameAsIteratorTests
+
+class TestParallelTLVParser(unittest.TestCase):
+
+   def setUp(self) -> None:
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         self.record = bytes.fromhex(f.read())
+      self.dump = SameAsIteratorTests().dump
+
+   def assertSameAsSequential(self, input: bytes):
+      expected_parser = TLVParser()
+      expected = expected_parser.parse_buffer(input)
+      parser = ParallelTLVParser(jobs=2, min_part_size=len(self.record))
+      result = parser.parse_buffer(input)
+      self.assertEqual(self.dump(result), self.dump(expected))
+      self.assertEqual(parser.diagnostic_collector.get_diagnostics(),
+                       expected_parser.diagnostic_collector.get_diagnostics())
+      return result
+
+   def test_scan_top_level(self):
+      input = b'\x81\x01\xFF\xA1\x03\x82\x01\xEE\x1f\x81\x00\x00\x81'
+      self.assertEqual(scan_top_level(to_buffer(input)), [0, 3, 8, 12])
+
+   def test_split_ranges(self):
+      self.assertEqual(split_ranges([0, 10, 20, 30, 40], 50, 2), [(0, 30), (30, 50)])
+      self.assertEqual(split_ranges([0], 50, 4), [(0, 50)])
+
+   def test_records(self):
+      result = self.assertSameAsSequential(self.record * 8)
+      self.assertEqual(len(result), 8)
+
+   def test_child_exceeding_parent(self):
+      # second record's child is one byte longer than the record
+      broken = b'\xA1\x03\x81\x02\x00\x01'
+      self.assertSameAsSequential(self.record * 3 + broken + self.record * 4)
+
+   def test_indefinite(self):
+      indefinite = bytes.fromhex('3080' '0401AA' '3180' '020105' '0000' '3100' '0000')
+      self.assertEqual(scan_top_level(to_buffer(indefinite * 2)), [0, 16])
+      result = self.assertSameAsSequential((self.record + indefinite) * 4)
+      self.assertEqual(len(result), 8)
+
+   def test_truncated(self):
+      self.assertSameAsSequential(self.record * 4 + self.record[:-5])
+
+   def test_file(self):
+      with tempfile.TemporaryDirectory() as dir:
+         path = os.path.join(dir, 'input.der')
+         with open(path, 'wb') as f:
+            f.write(self.record * 8)
+         result = ParallelTLVParser(jobs=2, min_part_size=len(self.record)).parse_file(path)
+         self.assertEqual(self.dump(result), self.dump(TLVParser().parse_buffer(self.record * 8)))
+
+   def test_pickle(self):
+      tlvs = TLVParser().parse_buffer(self.record, lazy=True)
+      self.assertEqual(self.dump(pickle.loads(pickle.dumps(tlvs))), self.dump(tlvs))
+
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from tlvisuals.parse_cache import ParseCache
+from tlvisuals.tlv_parser import TLVParser
+from tlvisuals.output_builder.raw_format import RawFormatBuilder
+
+class TestParseCache(unittest.TestCase):
+
+   def setUp(self) -> None:
+      self.temp_dir = tempfile.TemporaryDirectory()
+      self.cache = ParseCache(self.temp_dir.name)
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         self.input = bytes.fromhex(f.read())
+
+   def tearDown(self) -> None:
+      self.temp_dir.cleanup()
+
+   def test_store_load(self):
+      key = self.cache.get_key(self.input)
+      self.assertIsNone(self.cache.load(key, self.input))
+      tlvs = TLVParser().parse_buffer(self.input)
+      self.cache.store(key, tlvs)
+      loaded = self.cache.load(key, self.input)
+      self.assertEqual(RawFormatBuilder().build(loaded), RawFormatBuilder().build(tlvs))
+
+   def test_indefinite(self):
+      input = bytes.fromhex('3080' '3080' '020101' '0000' '3000' '040102' '0000' '0500')
+      key = self.cache.get_key(input)
+      tlvs = TLVParser().parse_buffer(input)
+      self.cache.store(key, tlvs)
+      loaded = self.cache.load(key, input)
+      self.assertEqual(RawFormatBuilder().build(loaded), RawFormatBuilder().build(tlvs))
+      self.assertIs(loaded[0].length.indefinite, True)
+
+   def test_key(self):
+      self.assertEqual(self.cache.get_key(self.input), self.cache.get_key(bytearray(self.input)))
+      self.assertNotEqual(self.cache.get_key(self.input), self.cache.get_key(self.input[:-1]))
+      other_version = ParseCache(self.temp_dir.name)
+      other_version.VERSION = ParseCache.VERSION + 1
+      self.assertNotEqual(self.cache.get_key(self.input), other_version.get_key(self.input))
+
+   def test_invalid_entry(self):
+      key = self.cache.get_key(self.input)
+      with open(os.path.join(self.temp_dir.name, key + ParseCache.SUFFIX), 'wb') as f:
+         f.write(b'TLVPC\x01')
+      self.assertIsNone(self.cache.load(key, self.input))
+
+   def test_removed_while_loading(self):
+      key = self.cache.get_key(self.input)
+      self.cache.store(key, TLVParser().parse_buffer(self.input))
+      # evicted by another process between the read and the touch
+      with mock.patch('os.utime', side_effect=FileNotFoundError):
+         self.assertIsNone(self.cache.load(key, self.input))
+
+   def test_evict(self):
+      inputs = [bytes.fromhex('0401') + bytes([i]) for i in range(3)]
+      keys = [self.cache.get_key(input) for input in inputs]
+      for i, (key, input) in enumerate(zip(keys, inputs)):
+         self.cache.store(key, TLVParser().parse_buffer(input))
+         path = os.path.join(self.temp_dir.name, key + ParseCache.SUFFIX)
+         os.utime(path, ns=(i * 10**9, i * 10**9))
+      entry_size = os.path.getsize(path)
+      # the oldest entry is used again, so the second one is evicted first
+      self.assertIsNotNone(self.cache.load(keys[0], inputs[0]))
+      self.cache.max_size = 2 * entry_size
+      self.cache.evict()
+      self.assertEqual(sorted(os.listdir(self.temp_dir.name)), sorted([keys[0] + ParseCache.SUFFIX, keys[2] + ParseCache.SUFFIX]))
@@ -1,7 +1,9 @@
+import os
+import tempfile
 from typing import cast
 import unittest
 
-from tlvisuals.tlv_parser import TLVParser, TagClass, TagType
+from tlvisuals.tlv_parser import TLVParser, TagClass, TagType, ParseEventType, SMALL_VALUE_SIZE, map_file, read_length, read_tag_end, tree_events
 from tlvisuals.tlv import TLV, ConstructedValue, Length, PrimitiveValue, Tag
 
 class TestTLVParser(unittest.TestCase):
@@ -66,6 +68,20 @@ class TestTLVParser(unittest.TestCase):
       result = self.parser._parse_tag(iter)
       self.assertEqual(len(self.parser.diagnostic_collector.get_diagnostics()), 1)
 
+   def test_first_subs_tag_byte_0_cached(self):
+      # reported again when the tag comes from the cache
+      for _ in range(2):
+         parser = TLVParser()
+         parser._parse_tag(b'\x1f\x80\x01'.__iter__())
+         self.assertEqual(len(parser.diagnostic_collector.get_diagnostics()), 1)
+
+   def test_tags_interned(self):
+      first = self.parser._parse_tag(b'\x9f\x02'.__iter__())
+      second = TLVParser().parse_buffer(b'\x9f\x02\x00')[0].tag
+      self.assertIs(first, second)
+      self.assertEqual(first.tag_number, 2)
+      self.assertIs(self.parser._parse_tag(b'\x81'.__iter__()), self.parser._parse_tag(b'\x81'.__iter__()))
+
    def test_tag_multiple_eof(self):
       bytes = b'\x1f\x81'
       iter = bytes.__iter__()
@@ -98,6 +114,46 @@ class TestTLVParser(unittest.TestCase):
       self.assertEqual(length.length, 16_843_009)
       self.assertEqual(length.raw, bytes)
 
+   def test_length_indefinite(self):
+      length = self.parser._parse_length(b'\x80'.__iter__())
+      self.assertTrue(length.indefinite)
+      self.assertIsNone(length.length)
+      self.assertEqual(length.raw, b'\x80')
+
+   def test_indefinite_nested(self):
+      # 30 80 { 04 01 AA, 31 80 { 02 01 05 } } 05 00
+      bytes = b'\x30\x80\x04\x01\xAA\x31\x80\x02\x01\x05\x00\x00\x00\x00\x05\x00'
+      result = self.parser.parse_tlv(bytes.__iter__())
+      self.assertEqual(len(self.parser.diagnostic_collector.get_diagnostics()), 0)
+      self.assertEqual(len(result), 2)
+      self.assertEqual(result[0].length.length, 10)
+      self.assertEqual(len(result[0].value.children), 2)
+      inner = result[0].value.children[1]
+      self.assertEqual(inner.length.length, 3)
+      self.assertEqual(len(inner.value.children), 1)
+      self.assertEqual(inner.value.children[0].value.raw, b'\x05')
+      self.assertEqual(result[1].tag.raw, b'\x05')
+
+   def test_deep_nesting(self):
+      depth = 20000
+      bytes = b'\xA1\x80' * depth + b'\x81\x00' + b'\x00\x00' * depth
+      result = self.parser.parse_tlv(bytes.__iter__())
+      self.assertEqual(len(self.parser.diagnostic_collector.get_diagnostics()), 0)
+      for _ in range(depth):
+         self.assertEqual(result[0].tag.raw, b'\xA1')
+         result = result[0].value.children
+      self.assertEqual(result[0].tag.raw, b'\x81')
+
+   def test_indefinite_missing_end_of_contents(self):
+      result = self.parser.parse_tlv(b'\x30\x80\x04\x01\xAA'.__iter__())
+      self.assertEqual(len(result[0].value.children), 1)
+      self.assertEqual(len(self.parser.diagnostic_collector.get_diagnostics()), 1)
+
+   def test_indefinite_primitive(self):
+      result = self.parser.parse_tlv(b'\x04\x80\x01\x00\x00'.__iter__())
+      self.assertEqual(result, [])
+      self.assertEqual(len(self.parser.diagnostic_collector.get_diagnostics()), 1)
+
    def test_length_eof(self):
       bytes = b'\x84\x01\x01\x01'
       iter = bytes.__iter__()
@@ -126,14 +182,14 @@ class TestTLVParser(unittest.TestCase):
       self.assertEqual(len(self.parser.diagnostic_collector.get_diagnostics()),1)
 
 
+   def parse_constructed(self, content: bytes, length: int) -> ConstructedValue:
+      """ value of a constructed TLV of length followed by content """
+      input = (self.create_constructed_tag().raw + self.create_length(length).raw + content).__iter__()
+      return self.parser.parse_tlv(input)[0].value
+
    def test_value_constructed(self):
       bytes = b'\x81\x04\x00\x01\x02\x03\x82\x04\x00\x00\x00\x00'
-      input = bytes.__iter__()
-      test_tlv = TLV(
-         self.create_constructed_tag(),
-         self.create_length(12),
-      )
-      value =  self.parser._parse_value(input, test_tlv)
+      value =  self.parse_constructed(bytes, 12)
       self.assertTrue(type(value) is ConstructedValue)
       self.assertEqual(len(cast(ConstructedValue, value).children), 2)
       self.assertEqual(cast(ConstructedValue, value).children[0].tag.raw, b'\x81')
@@ -142,12 +198,7 @@ class TestTLVParser(unittest.TestCase):
    
    def test_value_constructed_nested(self):
       bytes = b'\xA1\x04\xA2\x02\xA3\x00'
-      input = bytes.__iter__()
-      test_tlv = TLV(
-         self.create_constructed_tag(),
-         self.create_length(12),
-      )
-      value =  self.parser._parse_value(input, test_tlv)
+      value =  self.parse_constructed(bytes, 12)
       self.assertTrue(type(value) is ConstructedValue)
       self.assertEqual(len(cast(ConstructedValue, value).children), 1)
       self.assertEqual(cast(ConstructedValue, value).children[0].tag.raw, b'\xA1')
@@ -166,17 +217,257 @@ class TestTLVParser(unittest.TestCase):
    
    def test_value_constructed_value_too_long(self):
       bytes = b'\x81\x04\x00\x01\x02\x03'
-      input = bytes.__iter__()
-      test_tlv = TLV(
-         self.create_constructed_tag(),
-         self.create_length(4),
-      )
-      value =  self.parser._parse_value(input, test_tlv)
+      value =  self.parse_constructed(bytes, 4)
       self.assertTrue(type(value) is ConstructedValue)
       self.assertEqual(len(cast(ConstructedValue, value).children), 1)
       self.assertEqual(cast(ConstructedValue, value).children[0].tag.raw, b'\x81')
       self.assertEqual(len(self.parser.diagnostic_collector.get_diagnostics()), 1)
 
 
+class SameAsIteratorTests:
+   """ the other parse paths should give the same tree and diagnostics as parse_tlv """
+
+   def parse(self, parser: TLVParser, input: bytes) -> list[TLV]:
+      raise NotImplementedError()
+
+   def dump(self, tlvs: list[TLV]) -> list:
+      result = []
+      for tlv in tlvs:
+         if tlv.value is None:
+            value = None
+         elif isinstance(tlv.value, ConstructedValue):
+            value = self.dump(tlv.value.children)
+         else:
+            value = bytes(tlv.value.raw)
+         result.append((tlv.tag.cla, tlv.tag.type, tlv.tag.tag_number, bytes(tlv.tag.raw),
+                        tlv.length.length, bytes(tlv.length.raw), value))
+      return result
+
+   def assertSameAsIterator(self, input: bytes):
+      iter_parser = TLVParser()
+      expected = iter_parser.parse_tlv(input.__iter__())
+      parser = TLVParser()
+      result = self.parse(parser, input)
+      self.assertEqual(self.dump(result), self.dump(expected))
+      self.assertEqual(parser.diagnostic_collector.get_diagnostics(),
+                       iter_parser.diagnostic_collector.get_diagnostics())
+      return result
+
+   def test_input_file(self):
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         input = bytes.fromhex(f.read())
+      result = self.assertSameAsIterator(input)
+      self.assertEqual(len(result), 1)
+
+   def test_multi_byte_tags_and_lengths(self):
+      self.assertSameAsIterator(b'\x1f\x81\x00\x01\xAA\xBF\xff\x80\x01\x81\x03\x9f\x02\x00\x04\x82\x00\x01\x00')
+
+   def test_indefinite(self):
+      inputs = [
+         b'\x30\x80\x04\x01\xAA\x31\x80\x02\x01\x05\x00\x00\x00\x00\x05\x00',
+         b'\x30\x80\x00\x00',
+         b'\xA1\x06\x30\x80\x81\x00\x00\x00\x82\x00',
+         b'\x30\x80\x30\x03\x04\x01\xAA\x00\x00',
+         b'\x30\x80\x04\x01\xAA',
+         b'\x30\x80\x04\x80\x00\x00',
+         b'\x00\x00\x30\x80\x00\x00',
+      ]
+      for input in inputs:
+         with self.subTest(input=input.hex()):
+            self.assertSameAsIterator(input)
+
+   def deep_input(self, depth: int, indefinite: bool) -> bytes:
+      """ depth nested constructed TLVs around a primitive """
+      inner = b'\x04\x01\xAA'
+      if indefinite:
+         return b'\x30\x80' * depth + inner + b'\x00\x00' * depth
+      headers = []
+      length = len(inner)
+      for _ in range(depth):
+         length_bytes = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+         header = b'\x30' + (length_bytes if length < 128 else bytes([0x80 | len(length_bytes)]) + length_bytes)
+         headers.append(header)
+         length += len(header)
+      return b''.join(reversed(headers)) + inner
+
+   def test_deep_nesting(self):
+      depth = 20000
+      for indefinite in [False, True]:
+         with self.subTest(indefinite=indefinite):
+            parser = TLVParser()
+            tlvs = self.parse(parser, self.deep_input(depth, indefinite))
+            self.assertEqual(parser.diagnostic_collector.get_diagnostics(), [])
+            for _ in range(depth):
+               self.assertEqual(len(tlvs), 1)
+               self.assertEqual(tlvs[0].tag.raw, b'\x30')
+               tlvs = tlvs[0].value.children
+            self.assertEqual(tlvs[0].value.raw, b'\xAA')
+
+   def test_malformed(self):
+      inputs = [
+         b'\x1f\x81',
+         b'\x1f\x80\x01\x00',
+         b'\x81\x84\x01\x01\x01',
+         b'\x81\x04\x01\x02\x03',
+         b'\xA1\x04\x81\x04\x00\x01\x02\x03\x82\x00',
+         b'\xA1\x03\x81\x04\x00\x01',
+         b'\xA1\x02\xA2\x04\x81\x00\x81\x00\x81\x00',
+         b'\xA1\x03\x1f\x81\x81\x01',
+         b'\xA1\x80\x81\x00',
+         b'\xA1\x02\x1f\x80\x81\x01',
+         b'\xA1\x01\x1f\x80\x81',
+      ]
+      for input in inputs:
+         with self.subTest(input=input.hex()):
+            self.assertSameAsIterator(input)
+
+
+class TestTLVParserBuffer(SameAsIteratorTests, unittest.TestCase):
+
+   def parse(self, parser: TLVParser, input: bytes) -> list[TLV]:
+      return parser.parse_buffer(input)
+
+   def test_raw_is_slice(self):
+      large = SMALL_VALUE_SIZE + 1
+      input = bytearray(b'\x30\x81' + bytes([large + 6]) + b'\x81\x01\xFF\x82\x81' + bytes([large]) + b'\xAA' * large)
+      result = TLVParser().parse_buffer(input)
+      small, long = [child.value for child in result[0].value.children]
+      # short values are copied, long ones are slices over the input
+      self.assertIsInstance(small.raw, bytes)
+      self.assertIsInstance(long.raw, memoryview)
+      self.assertIsInstance(result[0].length.raw, bytes)
+      input[5] = 0xEE
+      input[-1] = 0xEE
+      self.assertEqual(small.raw, b'\xFF')
+      self.assertEqual(long.raw, b'\xAA' * (large - 1) + b'\xEE')
+
+   def test_tags_immutable(self):
+      input = bytes.fromhex('3006' '9F0201FF' '8100')
+      tag = TLVParser().parse_buffer(input)[0].value.children[0].tag
+      for name in ['cla', 'type', 'tag_number', 'raw']:
+         with self.assertRaises(AttributeError):
+            setattr(tag, name, getattr(tag, name))
+      # interned tags are shared by later parses too
+      self.assertIs(TLVParser().parse_buffer(input)[0].value.children[0].tag, tag)
+      self.assertEqual(tag.tag_number, 2)
+
+   def test_lazy_same_tree(self):
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         input = bytes.fromhex(f.read())
+      expected = TLVParser().parse_buffer(input)
+      result = TLVParser().parse_buffer(input, lazy=True)
+      self.assertEqual(self.dump(result), self.dump(expected))
+
+   def test_lazy_children_parsed_on_access(self):
+      input = b'\xA1\x05\xA2\x03\x81\x01\xFF\x82\x01\xEE'
+      parser = TLVParser()
+      result = parser.parse_buffer(input, lazy=True)
+      self.assertEqual(len(result), 2)
+      value = cast(ConstructedValue, result[0].value)
+      self.assertFalse(value.is_loaded())
+      self.assertEqual(value.source, b'\xA2\x03\x81\x01\xFF')
+
+      child = value.children[0]
+      self.assertTrue(value.is_loaded())
+      self.assertFalse(child.value.is_loaded())
+      self.assertEqual(child.value.children[0].value.raw, b'\xFF')
+
+   def test_lazy_diagnostics_deferred(self):
+      input = b'\xA1\x03\x81\x04\x00\x82\x00'
+      parser = TLVParser()
+      result = parser.parse_buffer(input, lazy=True)
+      self.assertEqual(len(result), 2)
+      self.assertEqual(parser.diagnostic_collector.get_diagnostics(), [])
+
+      self.assertEqual(len(result[0].value.children), 1)
+      self.assertEqual(len(parser.diagnostic_collector.get_diagnostics()), 2)
+
+   def test_lazy_truncated(self):
+      parser = TLVParser()
+      result = parser.parse_buffer(b'\xA1\x05\x81\x01\xFF', lazy=True)
+      self.assertEqual(len(result), 1)
+      self.assertEqual(len(parser.diagnostic_collector.get_diagnostics()), 1)
+      self.assertEqual(len(result[0].value.children), 1)
+
+   def test_lazy_indefinite(self):
+      input = b'\x30\x80\x04\x01\xAA\x31\x80\x02\x01\x05\x00\x00\x00\x00\x05\x00'
+      expected = TLVParser().parse_buffer(input)
+      parser = TLVParser()
+      result = parser.parse_buffer(input, lazy=True)
+      self.assertFalse(result[0].value.is_loaded())
+      self.assertEqual(result[0].length.length, 10)
+      self.assertEqual(self.dump(result), self.dump(expected))
+      self.assertEqual(parser.diagnostic_collector.get_diagnostics(), [])
+
+   def test_find_end_of_contents(self):
+      parser = TLVParser()
+      # nested indefinite, and 00 00 inside a definite value which is skipped
+      input = b'\x31\x80\x04\x02\x00\x00\x00\x00\x1f\x81\x01\x00\x00\x00'
+      self.assertEqual(parser._find_end_of_contents(memoryview(input), 0), 12)
+      self.assertIsNone(parser._find_end_of_contents(memoryview(input[:-2]), 0))
+
+   def test_read_tag_length(self):
+      self.assertEqual(read_tag_end(b'\x9f\x81\x02\x01', 0), 3)
+      self.assertEqual(read_tag_end(b'\x9f\x81', 0), 3)
+      self.assertEqual(read_length(b'\x04\x82\x01\x00', 1), (256, 4))
+      self.assertEqual(read_length(b'\x30\x80', 1), (None, 2))
+      self.assertIsNone(read_length(b'\x04\x82\x01', 1))
+
+   def test_mapped_file(self):
+      with tempfile.TemporaryDirectory() as dir:
+         path = os.path.join(dir, 'input.der')
+         with open(path, 'wb') as f:
+            f.write(b'\x30\x03\x81\x01\xFF')
+         result = TLVParser().parse_buffer(map_file(path))
+         self.assertEqual(result[0].value.children[0].value.raw, b'\xFF')
+         del result
+
+         empty_path = os.path.join(dir, 'empty.der')
+         open(empty_path, 'wb').close()
+         self.assertEqual(TLVParser().parse_buffer(map_file(empty_path)), [])
+
+
+class TestTLVParserEvents(SameAsIteratorTests, unittest.TestCase):
+
+   def parse(self, parser: TLVParser, input: bytes) -> list[TLV]:
+      stack = [[]]
+      for event in parser.iter_events(input.__iter__()):
+         if event.type == ParseEventType.PRIMITIVE:
+            stack[-1].append(event.tlv)
+         elif event.type == ParseEventType.START_CONSTRUCTED:
+            stack[-1].append(event.tlv)
+            stack.append([])
+         else:
+            children = stack.pop()
+            if event.tlv.value is not None:
+               event.tlv.value.children = children
+      return stack[0]
+
+   def test_offsets(self):
+      input = b'\x81\x01\xFF\xA1\x05\xA2\x03\x81\x01\xEE\xA3\x00'
+      events = [(event.type, event.depth, event.offset, event.end_offset)
+                for event in TLVParser().iter_events(input.__iter__())]
+      self.assertEqual(events, [
+         (ParseEventType.PRIMITIVE, 0, 0, 3),
+         (ParseEventType.START_CONSTRUCTED, 0, 3, None),
+         (ParseEventType.START_CONSTRUCTED, 1, 5, None),
+         (ParseEventType.PRIMITIVE, 2, 7, 10),
+         (ParseEventType.END_CONSTRUCTED, 1, 5, 10),
+         (ParseEventType.END_CONSTRUCTED, 0, 3, 10),
+         (ParseEventType.START_CONSTRUCTED, 0, 10, None),
+         (ParseEventType.END_CONSTRUCTED, 0, 10, 12),
+      ])
+
+   def test_tree_events(self):
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         input = bytes.fromhex(f.read())
+      input += b'\x81\x01\xFF\xA1\x05\xA2\x03\x81\x01\xEE\xA3\x00\x30\x80\x04\x01\xAA\x31\x80\x00\x00\x00\x00'
+      expected = [(event.type, event.tlv.tag.raw, event.depth, event.offset, event.end_offset)
+                  for event in TLVParser().iter_events(input.__iter__())]
+      result = [(event.type, event.tlv.tag.raw, event.depth, event.offset, event.end_offset)
+                for event in tree_events(TLVParser().parse_buffer(input))]
+      self.assertEqual(result, expected)
+
+
 if __name__ == "__main__":
    unittest.main()
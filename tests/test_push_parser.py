@@ -0,0 +1,68 @@
+import os
+import unittest
+from tlvisuals.push_parser import PushTLVParser, read_header
+from tlvisuals.tlv_parser import TLVParser
+from tlvisuals.output_builder.raw_format import RawFormatBuilder
+
+class TestPushTLVParser(unittest.TestCase):
+
+   def setUp(self) -> None:
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         record = bytes.fromhex(f.read())
+      self.input = (record + b'\x81\x01\xFF' + b'\x30\x80\x04\x01\xAA\x31\x80\x00\x00\x00\x00'
+                    + b'\x9f\x81\x01\x82\x00\x02\xBB\xCC' + record)
+
+   def feed_chunks(self, parser: PushTLVParser, input: bytes, size: int) -> list:
+      result = []
+      for i in range(0, len(input), size):
+         result.extend(parser.feed(input[i:i+size]))
+      result.extend(parser.close())
+      return result
+
+   def test_same_as_parse_buffer(self):
+      expected = RawFormatBuilder().build(TLVParser().parse_buffer(self.input))
+      for size in [1, 2, 3, 7, 100, len(self.input)]:
+         with self.subTest(size=size):
+            parser = PushTLVParser()
+            result = self.feed_chunks(parser, self.input, size)
+            self.assertEqual(len(result), 5)
+            self.assertEqual(RawFormatBuilder().build(result), expected)
+            self.assertEqual(parser.diagnostic_collector.get_diagnostics(), [])
+
+   def test_returns_completed(self):
+      parser = PushTLVParser()
+      self.assertEqual(parser.feed(b'\x81\x01'), [])
+      result = parser.feed(b'\xFF\x30\x80\x04\x01')
+      self.assertEqual(len(result), 1)
+      self.assertEqual(result[0].value.raw, b'\xFF')
+      # only the incomplete TLV is kept
+      self.assertEqual(bytes(parser._pending), b'\x30\x80\x04\x01')
+      self.assertEqual(parser.feed(b'\xAA\x00'), [])
+      result = parser.feed(b'\x00')
+      self.assertEqual(result[0].length.length, 3)
+      self.assertEqual(parser.close(), [])
+
+   def test_truncated(self):
+      parser = PushTLVParser()
+      self.assertEqual(len(parser.feed(b'\x81\x01\xFF\x30\x05\x04\x01')), 1)
+      result = parser.close()
+      self.assertEqual(len(result), 1)
+      self.assertEqual(len(parser.diagnostic_collector.get_diagnostics()), 1)
+      with self.assertRaises(ValueError):
+         parser.feed(b'\x00')
+
+   def test_invalid_stops(self):
+      parser = PushTLVParser()
+      self.assertEqual(len(parser.feed(b'\x81\x01\xFF\x04\x80\x81\x01\xFF')), 1)
+      self.assertEqual(parser.feed(b'\x81\x01\xFF'), [])
+      self.assertEqual(len(parser.diagnostic_collector.get_diagnostics()), 1)
+
+   def test_read_header(self):
+      self.assertEqual(read_header(bytearray(b'\x81\x01\xFF'), 0), (False, 1, 2))
+      self.assertEqual(read_header(bytearray(b'\x3f\x81\x01\x80'), 0), (True, None, 4))
+      self.assertEqual(read_header(bytearray(b'\x04\x82\x01\x00'), 0), (False, 256, 4))
+      self.assertIsNone(read_header(bytearray(b'\x04\x82\x01'), 0))
+      self.assertIsNone(read_header(bytearray(b'\x1f\x81'), 0))
+
+if __name__ == '__main__':
+   unittest.main()
@@ -68,6 +68,64 @@ class RawFormatOutputBuilderTest(unittest.TestCase):
       # print('\n')
       # print(expected)
       self.assertEqual(result, expected)
+   def test_indefinite(self):
+      from tlvisuals.tlv_parser import TLVParser
+      input = b'\x30\x80\x04\x01\xAA\x00\x00'
+      result = self.builder.build(TLVParser().parse_buffer(input))
+      self.assertEqual(result,
+         '30 (class:UNIVERSAL;type:CONSTRUCTED;tagnum:16) 80 (length:indefinite)\n'
+         '   04 (class:UNIVERSAL;type:PRIMITIVE;tagnum:4) 01 (length:1) AA\n')
+
+   def test_events_same_as_tree(self):
+      from tlvisuals.tlv_parser import TLVParser
+      input = b'\x81\x01\xFF\xA1\x05\xA2\x03\x81\x01\xEE\xA3\x00\x82\x00'
+      expected = self.builder.build(TLVParser().parse_tlv(input.__iter__()))
+
+      output = StringIO()
+      self.builder.build_events_on_output(TLVParser().iter_events(input.__iter__()), output)
+      self.assertEqual(output.getvalue(), expected)
+
+   def test_cached_strings(self):
+      from tlvisuals.tlv_parser import TLVParser
+      input = b'\x9f\x02\x01\xFF\x9f\x02\x81\x01\xEE\x30\x03\x9f\x02\x00'
+      tlvs = TLVParser().parse_buffer(input)
+      self.builder._inline_interpretation = False
+      self.assertEqual(self.builder.build(tlvs), '9F02 01 FF\n9F02 8101 EE\n30 03\n   9F02 00\n')
+      # same builder and tags, cached strings follow the interpretation flag
+      self.builder._inline_interpretation = True
+      self.assertEqual(self.builder.build(tlvs).splitlines()[1],
+         '9F02 (class:CONTEXT_SPECIFIC;type:PRIMITIVE;tagnum:2) 8101 (length:1) EE')
+
+   def test_flush_size(self):
+      from tlvisuals.tlv_parser import TLVParser
+      input = b'\x81\x01\xFF\xA1\x05\xA2\x03\x81\x01\xEE\xA3\x00\x82\x00'
+      expected = self.builder.build(TLVParser().parse_buffer(input))
+
+      class Writer:
+         def __init__(self):
+            self.writes = []
+         def write(self, s):
+            self.writes.append(s)
+
+      builder = RawFormatBuilder(flush_size=100)
+      tree_writer, events_writer = Writer(), Writer()
+      builder.build_on_output(TLVParser().parse_buffer(input), tree_writer)
+      builder.build_events_on_output(TLVParser().iter_events(input.__iter__()), events_writer)
+      for writer in [tree_writer, events_writer]:
+         self.assertEqual(''.join(writer.writes), expected)
+         self.assertGreater(len(writer.writes), 2)
+         self.assertTrue(all(len(s) < 100 + 80 for s in writer.writes))
+
+   def test_deep_nesting(self):
+      from tlvisuals.tlv_parser import TLVParser
+      # output grows with the square of the depth
+      depth = 3000
+      input = b'\x30\x80' * depth + b'\x04\x01\xAA' + b'\x00\x00' * depth
+      self.builder._inline_interpretation = False
+      result = self.builder.build(TLVParser().parse_buffer(input))
+      lines = result.splitlines()
+      self.assertEqual(len(lines), depth + 1)
+      self.assertEqual(lines[-1], '   ' * depth + '04 01 AA')
 
 if __name__ == '__main__':
    unittest.main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import unittest
+from tlvisuals.tag_dictionary import TagDictionary, X690_TAGS, EMV_TAGS, create_dictionary, decode_oid, \
+   decode_integer, decode_utc_time, decode_generalized_time, decode_compressed_numeric, decode_date
+from tlvisuals.tlv_parser import TLVParser, intern_tag
+from tlvisuals.output_builder.raw_format import RawFormatBuilder
+
+class TestDecoders(unittest.TestCase):
+
+   def test_oid(self):
+      self.assertEqual(decode_oid(bytes.fromhex('2A864886F70D01010B')), '1.2.840.113549.1.1.11')
+      self.assertEqual(decode_oid(bytes.fromhex('8837')), '2.999')
+      self.assertRaises(ValueError, decode_oid, bytes.fromhex('2A86'))
+      self.assertRaises(ValueError, decode_oid, b'')
+
+   def test_oid_arcs(self):
+      # arcs are cached by their encoding, the first one apart since it holds two numbers
+      self.assertEqual(decode_oid(bytes.fromhex('2A2A')), '1.2.42')
+      self.assertEqual(decode_oid(memoryview(bytes.fromhex('2A0080'))[:2]), '1.2.0')
+      self.assertRaises(ValueError, decode_oid, bytes.fromhex('2A8001'))
+      self.assertRaises(ValueError, decode_oid, bytes.fromhex('2A2A86'))
+
+   def test_integer(self):
+      self.assertEqual(decode_integer(bytes.fromhex('00FF')), '255')
+      self.assertEqual(decode_integer(bytes.fromhex('FF')), '-1')
+
+   def test_times(self):
+      self.assertEqual(decode_utc_time(b'491231235959Z'), '2049-12-31 23:59:59 UTC')
+      self.assertEqual(decode_utc_time(b'5001010000+0100'), '1950-01-01 00:00:00 +0100')
+      self.assertEqual(decode_generalized_time(b'20240229120000.5Z'), '2024-02-29 12:00:00.5 UTC')
+      self.assertRaises(ValueError, decode_utc_time, b'2401')
+
+   def test_emv(self):
+      self.assertEqual(decode_compressed_numeric(bytes.fromhex('12345678901FFF')), '12345678901')
+      self.assertEqual(decode_date(bytes.fromhex('271231')), '2027-12-31')
+      self.assertRaises(ValueError, decode_date, bytes.fromhex('2712'))
+
+
+class TestTagDictionary(unittest.TestCase):
+
+   def test_lookup(self):
+      dictionary = create_dictionary('all')
+      self.assertEqual(dictionary.get_name(intern_tag(b'\x30')), 'SEQUENCE')
+      self.assertEqual(dictionary.get_name(intern_tag(b'\x06')), 'OBJECT IDENTIFIER')
+      self.assertEqual(dictionary.get_name(intern_tag(b'\x9f\x02')), 'Amount, Authorised')
+      self.assertIsNone(dictionary.get_name(intern_tag(b'\xdf\x01')))
+      self.assertIsNone(create_dictionary('emv').get_name(intern_tag(b'\x30')))
+      self.assertRaises(ValueError, create_dictionary, 'other')
+
+   def test_decode(self):
+      dictionary = TagDictionary(X690_TAGS, EMV_TAGS)
+      self.assertEqual(dictionary.decode(intern_tag(b'\x01'), b'\x00'), 'FALSE')
+      self.assertEqual(dictionary.decode(intern_tag(b'\x5f\x2a'), bytes.fromhex('0978')), '978')
+      # invalid values and tags without decoders are not decoded
+      self.assertIsNone(dictionary.decode(intern_tag(b'\x01'), b'\x00\x00'))
+      self.assertIsNone(dictionary.decode(intern_tag(b'\x04'), b'\x00'))
+      self.assertIsNone(dictionary.decode(intern_tag(b'\x30'), b''))
+
+   def test_memo(self):
+      calls = []
+      dictionary = TagDictionary()
+      dictionary.register(b'\xdf\x01', 'Counter', lambda value: calls.append(value) or value.hex())
+      tag = intern_tag(b'\xdf\x01')
+      for _ in range(3):
+         self.assertEqual(dictionary.decode(tag, memoryview(b'\x01\x02')), '0102')
+      self.assertEqual(calls, [b'\x01\x02'])
+      # long values are decoded each time
+      long_value = bytes(TagDictionary.MEMO_MAX_VALUE + 1)
+      dictionary.decode(tag, long_value)
+      dictionary.decode(tag, long_value)
+      self.assertEqual(len(calls), 3)
+
+   def test_builder(self):
+      input = bytes.fromhex('3008' '06032A8648' '020105')
+      tlvs = TLVParser().parse_buffer(input)
+      self.assertEqual(RawFormatBuilder(inline_interpretation=False, tag_dictionary=create_dictionary('x690')).build(tlvs),
+         '30 (name:SEQUENCE) 08\n'
+         '   06 (name:OBJECT IDENTIFIER) 03 2A8648 (value:1.2.840)\n'
+         '   02 (name:INTEGER) 01 05 (value:5)\n')
+      self.assertEqual(RawFormatBuilder(tag_dictionary=create_dictionary('emv')).build(tlvs).splitlines()[2],
+         '   02 (class:UNIVERSAL;type:PRIMITIVE;tagnum:2) 01 (length:1) 05')
+      self.assertEqual(RawFormatBuilder(tag_dictionary=create_dictionary('x690')).build(tlvs).splitlines()[2],
+         '   02 (class:UNIVERSAL;type:PRIMITIVE;tagnum:2;name:INTEGER) 01 (length:1) 05 (value:5)')
+
+   def test_memo_bounded(self):
+      dictionary = create_dictionary('x690')
+      dictionary.MEMO_SIZE = 100
+      tag = intern_tag(b'\x02')
+      for serial in range(1000):
+         self.assertEqual(dictionary.decode(tag, serial.to_bytes(4, 'big')), str(serial))
+      self.assertLessEqual(len(dictionary._memo), 100)
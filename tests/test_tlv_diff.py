@@ -0,0 +1,59 @@
+import os
+import unittest
+from tlvisuals.tlv_diff import DiffType, diff_buffers, diff_tlvs
+from tlvisuals.tlv_parser import TLVParser
+
+class TestTLVDiff(unittest.TestCase):
+
+   def diff(self, old: bytes, new: bytes) -> list[tuple]:
+      return [(diff.type, diff.path, diff.old_offset, diff.new_offset) for diff in diff_buffers(old, new)]
+
+   def test_equal(self):
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         input = bytes.fromhex(f.read())
+      self.assertEqual(self.diff(input, bytes(input)), [])
+
+   def test_changes(self):
+      # 30 { 04 01, A1 { 04 02 }, 04 03 }, 05 00
+      old = bytes.fromhex('300B' '040101' 'A103' '040102' '040103' '0500')
+      # 30 { 04 01, A1 { 04 FF, 02 05 }, 05 00 }, 05 00
+      new = bytes.fromhex('300D' '040101' 'A106' '0401FF' '020105' '0500' '0500')
+      self.assertEqual(self.diff(old, new), [
+         (DiffType.CHANGED, '30[0]', 0, 0),
+         (DiffType.CHANGED, '30[0]/A1[0]', 5, 5),
+         (DiffType.CHANGED, '30[0]/A1[0]/04[0]', 7, 7),
+         (DiffType.ADDED, '30[0]/A1[0]/02[0]', None, 10),
+         (DiffType.REMOVED, '30[0]/04[1]', 10, None),
+         (DiffType.ADDED, '30[0]/05[0]', None, 13),
+      ])
+
+   def test_equal_subtrees_not_loaded(self):
+      old = bytes.fromhex('3009' 'A103' '040101' 'A202' '0500')
+      new = bytes.fromhex('3009' 'A103' '040101' 'A202' '0600')
+      parser = TLVParser()
+      old_tlvs, new_tlvs = parser.parse_buffer(old, lazy=True), parser.parse_buffer(new, lazy=True)
+      self.assertEqual([diff.path for diff in diff_tlvs(old_tlvs, new_tlvs)], ['30[0]/A2[0]/05[0]', '30[0]/A2[0]/06[0]'])
+      self.assertFalse(old_tlvs[0].value.children[0].value.is_loaded())
+      self.assertFalse(new_tlvs[0].value.children[0].value.is_loaded())
+
+   def test_replaced_children(self):
+      input = bytes.fromhex('3006' 'A104' '04020101')
+      old, new = TLVParser().parse_buffer(input, lazy=True), TLVParser().parse_buffer(input, lazy=True)
+      new[0].value.children = TLVParser().parse_buffer(bytes.fromhex('A104' '04020102'))
+      self.assertIsNone(new[0].value.source)
+      self.assertEqual([(diff.type, diff.path) for diff in diff_tlvs(old, new)], [(DiffType.CHANGED, '30[0]/A1[0]/04[0]')])
+
+   def test_indefinite(self):
+      old = bytes.fromhex('3080' '040101' '0000' '3080' '0000')
+      new = bytes.fromhex('3080' '040102' '0000' '3080' '0000')
+      self.assertEqual(self.diff(old, new), [(DiffType.CHANGED, '30[0]/04[0]', 2, 2)])
+      self.assertEqual(self.diff(old, bytes.fromhex('3003' '040101' '3000')), [
+         (DiffType.CHANGED, '30[0]', 0, 0),
+         (DiffType.CHANGED, '30[1]', 7, 5),
+      ])
+
+   def test_eager_trees(self):
+      parser = TLVParser()
+      old = parser.parse_buffer(bytes.fromhex('3006' '040101' '040102'))
+      new = parser.parse_buffer(bytes.fromhex('3006' '040101' '040103'))
+      self.assertEqual([(diff.type, diff.path) for diff in diff_tlvs(old, new)], [(DiffType.CHANGED, '30[0]/04[1]')])
@@ -0,0 +1,71 @@
+import os
+import unittest
+from io import BytesIO
+from tlvisuals.tlv import *
+from tlvisuals.tlv_encoder import TLVEncoder, encode_length
+from tlvisuals.tlv_parser import TLVParser, intern_tag
+
+class TestTLVEncoder(unittest.TestCase):
+
+   def setUp(self) -> None:
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         self.input = bytes.fromhex(f.read())
+
+   def test_encode_length(self):
+      self.assertEqual(encode_length(0), b'\x00')
+      self.assertEqual(encode_length(127), b'\x7f')
+      self.assertEqual(encode_length(128), b'\x81\x80')
+      self.assertEqual(encode_length(0x10000), b'\x83\x01\x00\x00')
+
+   def test_round_trip(self):
+      self.assertEqual(TLVEncoder().encode(TLVParser().parse_buffer(self.input)), self.input)
+      self.assertEqual(TLVEncoder().encode(TLVParser().parse_buffer(self.input, lazy=True)), self.input)
+      output = BytesIO()
+      TLVEncoder().encode_on_output(TLVParser().parse_buffer(self.input), output)
+      self.assertEqual(output.getvalue(), self.input)
+
+   def test_lazy_values_not_loaded(self):
+      tlvs = TLVParser().parse_buffer(self.input, lazy=True)
+      self.assertEqual(TLVEncoder().encode(tlvs), self.input)
+      self.assertFalse(tlvs[0].value.is_loaded())
+
+   def test_edited_tag(self):
+      # 30 { 04 01, 04 02 }, both 04 share one Tag
+      input = bytes.fromhex('3006' '040101' '040102')
+      tlvs = TLVParser().parse_buffer(input)
+      first, second = tlvs[0].value.children
+      self.assertIs(first.tag, second.tag)
+      with self.assertRaises(AttributeError):
+         second.tag.tag_number = 1
+      second.tag = intern_tag(b'\x81')
+      self.assertEqual(TLVEncoder().encode(tlvs), bytes.fromhex('3006' '040101' '810102'))
+      self.assertEqual(first.tag.raw, b'\x04')
+      self.assertEqual(TLVEncoder().encode(TLVParser().parse_buffer(input)), input)
+
+   def test_edited_lengths(self):
+      # 30 { 30 { 04 01 }, 81 8102 FFFF }, non minimal length of 81 is kept while unchanged
+      input = bytes.fromhex('300A' '3003' '040101' '818102FFFF')
+      tlvs = TLVParser().parse_buffer(input)
+      self.assertEqual(TLVEncoder().encode(tlvs), input)
+      tlvs[0].value.children[0].value.children[0].value = PrimitiveValue(bytes(200))
+      self.assertEqual(TLVEncoder().encode(tlvs),
+                       bytes.fromhex('3081D3' '3081CB' '0481C8') + bytes(200) + bytes.fromhex('818102FFFF'))
+
+   def test_built_tree(self):
+      tlvs = [TLV(intern_tag(b'\x30'), Length(None, b''), ConstructedValue([
+                 TLV(intern_tag(b'\x02'), Length(None, b''), PrimitiveValue(b'\x05')),
+                 TLV(intern_tag(b'\x05'), Length(None, b'')),
+                 TLV(intern_tag(b'\xa0'), Length(None, b'', True), ConstructedValue([
+                    TLV(intern_tag(b'\x9f\x02'), Length(None, b''), PrimitiveValue(b'\x12\x34')),
+                 ])),
+              ]))]
+      self.assertEqual(TLVEncoder().encode(tlvs).hex().upper(), '300E' '020105' '0500' 'A080' '9F02021234' '0000')
+
+   def test_indefinite(self):
+      input = bytes.fromhex('3080' '3080' '020101' '0000' '3080' '0000' '040102' '0000' '0500')
+      self.assertEqual(TLVEncoder().encode(TLVParser().parse_buffer(input)), input)
+      self.assertEqual(TLVEncoder().encode(TLVParser().parse_buffer(input, lazy=True)), input)
+
+   def test_primitive_indefinite(self):
+      tlvs = [TLV(intern_tag(b'\x04'), Length(None, b'\x80', True), PrimitiveValue(b'\x00'))]
+      self.assertRaises(ValueError, TLVEncoder().encode, tlvs)
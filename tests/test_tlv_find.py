@@ -0,0 +1,59 @@
+import os
+import unittest
+from tlvisuals.tlv_find import find_tags
+from tlvisuals.tlv_index import TLVIndex
+from tlvisuals.tlv_parser import DiagnosticsCollector
+
+class TestFindTags(unittest.TestCase):
+
+   def setUp(self) -> None:
+      # 30 { 81 FF, A1 { 04 01, 04 02 }, A1 {}, A1 { 04 03 } }, 05 00
+      self.input = bytes.fromhex('3012' '8101FF' 'A106' '040101' '040102' 'A100' 'A103' '040103' '0500')
+
+   def find(self, patterns: list[str], input: bytes|None = None) -> list[tuple]:
+      return [(match.offset, match.path, None if match.value is None else bytes(match.value))
+              for match in find_tags(self.input if input is None else input, patterns)]
+
+   def test_tag(self):
+      self.assertEqual(self.find(['04']), [
+         (7, '30[0]/A1[0]/04[0]', b'\x01'),
+         (10, '30[0]/A1[0]/04[1]', b'\x02'),
+         (17, '30[0]/A1[2]/04[0]', b'\x03'),
+      ])
+      self.assertEqual(self.find(['A1']), [(5, '30[0]/A1[0]', None), (13, '30[0]/A1[1]', None), (15, '30[0]/A1[2]', None)])
+
+   def test_paths(self):
+      self.assertEqual([match[0] for match in self.find(['A1[2]/04'])], [17])
+      self.assertEqual([match[0] for match in self.find(['/30/A1/04[1]'])], [10])
+      self.assertEqual(self.find(['/A1/04']), [])
+      self.assertEqual([match[0] for match in self.find(['05', '81'])], [2, 20])
+
+   def test_same_as_index(self):
+      with open(os.path.join(os.path.dirname(__file__), 'input_files', 'input.txt')) as f:
+         input = bytes.fromhex(f.read())
+      index = TLVIndex.build(input)
+      for path in ['30/30/30', '30/30/30[4]/30/06', '30/30/A3/30/30[1]/06']:
+         with self.subTest(path=path):
+            self.assertEqual([match[0] for match in self.find(['/' + path], input)],
+                             [index.offsets[entry] for entry in index.find(path)])
+
+   def test_indefinite(self):
+      input = b'\x30\x80\x04\x01\xAA\x31\x80\x04\x01\xBB\x00\x00\x00\x00\x04\x01\xCC'
+      self.assertEqual(self.find(['04'], input), [
+         (2, '30[0]/04[0]', b'\xAA'),
+         (7, '30[0]/31[0]/04[0]', b'\xBB'),
+         (14, '04[0]', b'\xCC'),
+      ])
+
+   def test_malformed(self):
+      diags = DiagnosticsCollector()
+      self.assertEqual(len(list(find_tags(b'\x04\x01\xAA\x30\x80\x04\x01\xBB', ['04'], diags))), 2)
+      self.assertEqual(len(diags.get_diagnostics()), 1)
+      diags = DiagnosticsCollector()
+      self.assertEqual(len(list(find_tags(b'\x04\x05\xAA', ['04'], diags))), 1)
+      self.assertEqual(len(diags.get_diagnostics()), 1)
+      with self.assertRaises(ValueError):
+         list(find_tags(self.input, ['0']))
+
+if __name__ == '__main__':
+   unittest.main()
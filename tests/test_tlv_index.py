@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from tlvisuals.tlv_index import TLVIndex, IndexFormatException, open_index, parse_entry, parse_path
+from tlvisuals.tlv_parser import map_file
+
+class TestTLVIndex(unittest.TestCase):
+
+   def setUp(self) -> None:
+      # 30 { 81 FF, A1 { 04 01, 04 02 }, A1 {}, A1 { 04 03 } }, 05 00
+      self.input = bytes.fromhex('3012' '8101FF' 'A106' '040101' '040102' 'A100' 'A103' '040103' '0500')
+      self.index = TLVIndex.build(self.input)
+
+   def test_build(self):
+      self.assertEqual(list(self.index.offsets), [0, 2, 5, 7, 10, 13, 15, 17, 20])
+      self.assertEqual(list(self.index.header_lens), [2] * 9)
+      self.assertEqual(list(self.index.value_lens), [18, 1, 6, 1, 1, 0, 3, 1, 0])
+      self.assertEqual(list(self.index.parents), [-1, 0, 0, 2, 2, 0, 0, 6, -1])
+      self.assertEqual(list(self.index.subtree_sizes), [7, 0, 2, 0, 0, 0, 1, 0, 0])
+      self.assertEqual(self.index.tags, [b'\x30', b'\x81', b'\xA1', b'\x04', b'\x05'])
+
+   def test_find(self):
+      self.assertEqual(self.index.find('30/A1/04'), [3, 4, 7])
+      self.assertEqual(self.index.find('30/A1[2]/04'), [7])
+      self.assertEqual(self.index.find('30/A1[0]/04[1]'), [4])
+      self.assertEqual(self.index.find('05'), [8])
+      self.assertEqual(self.index.find('30/A1[3]'), [])
+      self.assertEqual(self.index.get_path(7), '30[0]/A1[2]/04[0]')
+
+   def test_occurrences(self):
+      self.assertEqual(list(self.index.occurrences), [0, 0, 0, 0, 1, 1, 2, 0, 0])
+      # 30 { 02 01 * 20000, 05 00 }
+      input = bytes.fromhex('308300EA62') + bytes.fromhex('020101') * 20000 + bytes.fromhex('0500')
+      index = TLVIndex.build(input)
+      matches = index.find('30/02')
+      self.assertEqual(len(matches), 20000)
+      self.assertEqual([index.get_path(entry) for entry in matches[-2:]], ['30[0]/02[19998]', '30[0]/02[19999]'])
+      self.assertEqual(index.find('30/02[12345]'), [12346])
+      self.assertEqual(index.get_path(20001), '30[0]/05[0]')
+
+   def test_parse_path(self):
+      self.assertEqual(parse_path('30/a1[3]/9F02'), [(b'\x30', None), (b'\xA1', 3), (b'\x9F\x02', None)])
+      with self.assertRaises(ValueError):
+         parse_path('30/A')
+
+   def test_child_exceeding_parent(self):
+      index = TLVIndex.build(bytes.fromhex('A103' '040201' '0500'))
+      self.assertEqual(list(index.offsets), [0, 2, 5])
+      self.assertEqual(list(index.parents), [-1, 0, -1])
+
+   def test_indefinite(self):
+      # 30 80 { 04 01 AA, 31 80 { 02 01 05 } } 05 00
+      input = bytes.fromhex('3080' '0401AA' '3180' '020105' '0000' '0000' '0500')
+      index = TLVIndex.build(input)
+      self.assertEqual(list(index.offsets), [0, 2, 5, 7, 14])
+      self.assertEqual(list(index.value_lens), [12, 1, 5, 1, 0])
+      self.assertEqual(list(index.parents), [-1, 0, 0, 2, -1])
+      self.assertEqual(index.get_range(0), (0, 14))
+      tlvs = parse_entry(memoryview(input), index, 2)
+      self.assertEqual(tlvs[0].length.length, 3)
+
+   def test_open_index(self):
+      with tempfile.TemporaryDirectory() as dir:
+         path = os.path.join(dir, 'input.der')
+         with open(path, 'wb') as f:
+            f.write(self.input)
+         buffer = map_file(path)
+         index = open_index(path, buffer)
+         self.assertTrue(os.path.exists(path + TLVIndex.SUFFIX))
+
+         loaded, source_size, _ = TLVIndex.load(path + TLVIndex.SUFFIX)
+         self.assertEqual(source_size, len(self.input))
+         for expected, result in zip(index._arrays(), loaded._arrays()):
+            self.assertEqual(expected, result)
+         self.assertEqual(loaded.tags, index.tags)
+
+         tlvs = parse_entry(buffer, loaded, loaded.find('30/A1[2]')[0])
+         self.assertEqual(len(tlvs), 1)
+         self.assertEqual(tlvs[0].value.children[0].value.raw, b'\x03')
+         del tlvs, buffer
+
+   def test_invalid_file(self):
+      with tempfile.TemporaryDirectory() as dir:
+         path = os.path.join(dir, 'input.der' + TLVIndex.SUFFIX)
+         with open(path, 'wb') as f:
+            f.write(b'TLVIDX\x01')
+         with self.assertRaises(IndexFormatException):
+            TLVIndex.load(path)
+
+
+if __name__ == '__main__':
+   unittest.main()